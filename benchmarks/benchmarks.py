@@ -0,0 +1,398 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Benchmark the config generation, the GUI list harvesting, the GUI startup and the HDF5 loading
+            (single files and campaigns)
+
+The classes follow the asv conventions (setup_cache, setup, teardown, params,
+time_*, timeraw_*, track_* and peakmem_*), run them with "asv run". Without asv,
+"python benchmarks/benchmarks.py [filter]" times every time_* benchmark and
+records its tracemalloc memory peak, times the timeraw_* ones in a fresh
+interpreter and prints the track_* values. The synthetic HDF5 files are written
+once per class by setup_cache, in a folder removed after the class's benchmarks.
+"""
+
+# Imports
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# The sources are flat scripts importing each other by name
+SOURCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "tgpa")
+sys.path.insert(0, SOURCES)
+
+from keithleyDataClass import Keithley2700, DEFAULT_KEITHLEY_SETTINGS, DEFAULT_SENSORS_SETTINGS, CARD_CHANNELS
+
+CHANNELS = [10, 100, 1000, 5000]  # Number of configured channels
+SAMPLES = [1_000, 10_000, 100_000]  # Number of samples per channel in the HDF5 files
+CARDS = 2  # Cards per HDF5 file
+CHANNELS_PER_CARD = 20  # Channels per card in the HDF5 files
+CAMPAIGN_FILES = 4  # HDF5 files of a synthetic campaign
+TABS = [2, 10, 30]  # Cards (tabs) in the GUI
+# Libraries the GUI must not import when it starts, they are only needed to read measurement files
+HEAVY_MODULES = ("numpy", "pandas", "h5py", "PyPDF2", "openpyxl", "tkinter")
+
+
+# Functions definitions
+
+
+def build_keithley(nb_channels: int):
+
+    """Build an instrument with nb_channels channels spread over 40 channels cards"""
+
+    instrument = Keithley2700(sensors_settings=DEFAULT_SENSORS_SETTINGS, **DEFAULT_KEITHLEY_SETTINGS)
+    for index in range(nb_channels):
+        slot, offset = divmod(index, CARD_CHANNELS)
+        if offset == 0:
+            instrument.add_module(f"MODULE{slot + 1:02d}", "7702", f"Card {slot + 1}")
+        sensor = "frtd" if offset == 0 else "tc" if offset < 30 else "Volt"
+        instrument.modules[-1].config_channel(str((slot + 1) * 100 + offset + 1), sensor)
+    return instrument
+
+
+def write_pymodaq_h5(path: str, nb_samples: int, cards: int = CARDS, channels_per_card: int = CHANNELS_PER_CARD):
+
+    """Write a synthetic HDF5 file with PyMoDAQ's RawData/<scan>/<detector>/<axes|data>/<card> layout"""
+
+    import h5py
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    with h5py.File(path, "w") as f:
+        detector = f.create_group("RawData/Scan000/Detector000")
+        detector.create_dataset("NavAxes/Axis00", data=1.7e9 + np.arange(nb_samples, dtype=np.float64))
+        for card in range(cards):
+            group = detector.create_group(f"Data0D/CH{card:02d}")
+            for channel in range(channels_per_card):
+                dataset = group.create_dataset(f"Data{channel:02d}", data=rng.random((nb_samples, 1)))
+                label = '{"data": "[\'Temperature ' + str((card + 1) * 100 + channel + 1) + '\']"}'
+                dataset.attrs["label"] = np.bytes_(label.encode())
+
+
+def require_h5py():
+
+    """Skip the benchmark (asv's way) when h5py is not installed"""
+
+    try:
+        import h5py  # noqa: F401
+    except ImportError:
+        raise NotImplementedError("h5py is not available")
+
+
+# Classes definitions
+
+
+class ConfigGeneration:
+
+    """Keithley2700 / ModuleKeithley config generation"""
+
+    params = CHANNELS
+    param_names = ["channels"]
+
+    def setup(self, nb_channels):
+        self.instrument = build_keithley(nb_channels)
+        self.output_dir = tempfile.mkdtemp(prefix="tgpa_bench_")
+        self.output_path = os.path.join(self.output_dir, "config.toml")
+
+    def teardown(self, nb_channels):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def time_config_channel(self, nb_channels):
+        build_keithley(nb_channels)
+
+    def time_write_tolm(self, nb_channels):
+        # Everything rendered and written again, as for a new configuration
+        for module in self.instrument.modules:
+            module.mark_dirty()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.instrument.write_tolm(self.output_path)
+
+    def time_write_tolm_unchanged(self, nb_channels):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.instrument.write_tolm(self.output_path)
+
+    def time_write_tolm_one_module(self, nb_channels):
+        # One card changed : its channels rendered, the others copied from the deployed file
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.instrument.write_tolm(self.output_path)
+            self.instrument.modules[0].mark_dirty()
+            self.instrument.write_tolm(self.output_path)
+
+    def time_to_toml_string(self, nb_channels):
+        for module in self.instrument.modules:
+            module.mark_dirty()
+        self.instrument.to_toml_string()
+
+    def peakmem_write_tolm(self, nb_channels):
+        self.time_write_tolm(nb_channels)
+
+
+class GuiSaveTheList:
+
+    """MainWindow.save_the_list under an offscreen Qt platform"""
+
+    params = TABS
+    param_names = ["tabs"]
+
+    def setup(self, nb_tabs):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            from PyQt5.QtWidgets import QApplication
+            from PyQt5.QtCore import Qt
+        except ImportError:
+            raise NotImplementedError("PyQt5 is not available")
+        import tomlGeneratorGUI
+
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.window = self.open_window(nb_tabs)
+
+        # Show every tab and check every channel of every card, for one sensor after the other
+        for tab_index in range(self.window.tabs.count()):
+            self.window.tabs.setCurrentIndex(tab_index)
+            model = self.window.tabs.widget(tab_index).table_model
+            for row in range(model.rowCount()):
+                model.setData(model.index(row, row % 3), Qt.Checked, Qt.CheckStateRole)
+
+    def teardown(self, nb_tabs):
+        self.window.close()
+        self.window.deleteLater()
+
+    @staticmethod
+    def open_window(nb_tabs):
+        import tomlGeneratorGUI
+        window = tomlGeneratorGUI.MainWindow(keithleyChannelList=[str(e) for e in range(101, 141)])
+        for _ in range(nb_tabs - 1):
+            window.add_new_tab()
+        return window
+
+    def time_open_window(self, nb_tabs):
+        window = self.open_window(nb_tabs)
+        window.close()
+        window.deleteLater()
+
+    def time_save_the_list(self, nb_tabs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.window.save_the_list()
+
+
+class GuiStartup:
+
+    """Cold import of the GUI modules, each in a fresh interpreter"""
+
+    params = ["tomlGeneratorGUI"]  # tomlGeneratorKeithley is a script, it runs when imported
+    param_names = ["module"]
+
+    def timeraw_import(self, module):
+        return f"import {module}", f"import sys; sys.path.insert(0, {SOURCES!r})"
+
+    def track_heavy_modules(self, module):
+        # Startup guard : must stay at 0, a heavy library imported at startup shows up here
+        code = (f"import sys; sys.path.insert(0, {SOURCES!r}); import {module}; "
+                f"print(sum(name in sys.modules for name in {HEAVY_MODULES!r}))")
+        return int(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+
+    track_heavy_modules.unit = "modules"
+
+
+class Hdf5Loading:
+
+    """utilities.h5py_to_dataframe / get_card_data_into_dataframe on synthetic PyMoDAQ files"""
+
+    params = SAMPLES
+    param_names = ["samples"]
+
+    def setup_cache(self):
+        # Written in the working directory, which asv removes after the benchmarks of the class
+        require_h5py()
+        paths = {}
+        for nb_samples in SAMPLES:
+            paths[nb_samples] = os.path.abspath(f"scan_{nb_samples}.h5")
+            write_pymodaq_h5(paths[nb_samples], nb_samples)
+        return paths
+
+    def setup(self, paths, nb_samples):
+        require_h5py()
+        self.path = paths[nb_samples]
+        self.cards = [f"CH{card:02d}" for card in range(CARDS)]
+
+    def time_h5py_to_dataframe(self, paths, nb_samples):
+        import utilities
+        utilities.h5py_to_dataframe(self.path, "Scan000", "Detector000", "NavAxes", "Data0D", self.cards)
+
+    def time_get_card_data_into_dataframe(self, paths, nb_samples):
+        import h5py
+        import utilities
+        with h5py.File(self.path, "r", locking=False) as f:
+            utilities.get_card_data_into_dataframe(f["RawData/Scan000/Detector000/Data0D/CH00"],
+                                                   list(range(nb_samples)))
+
+    def peakmem_h5py_to_dataframe(self, paths, nb_samples):
+        self.time_h5py_to_dataframe(paths, nb_samples)
+
+    def time_iter_h5py_chunks(self, paths, nb_samples):
+        import utilities
+        for _ in utilities.iter_h5py_chunks(self.path, "Scan000", "Detector000", "NavAxes", "Data0D", self.cards,
+                                            rows=10_000):
+            pass
+
+    def peakmem_iter_h5py_chunks(self, paths, nb_samples):
+        self.time_iter_h5py_chunks(paths, nb_samples)
+
+    def time_map_scan(self, paths, nb_samples):
+        # One analysis pass over every signal, straight from the page cache
+        import utilities
+        seconds, signals = utilities.map_scan(self.path, "Scan000", "Detector000", "NavAxes", "Data0D", self.cards)
+        for card in signals:
+            for values in card.values():
+                values.sum()
+
+    def peakmem_map_scan(self, paths, nb_samples):
+        self.time_map_scan(paths, nb_samples)
+
+    def time_read_time_window(self, paths, nb_samples):
+        # Ten minutes (one sample per second) in the middle of the scan
+        import utilities
+        middle = 1.7e9 + nb_samples // 2
+        utilities.read_time_window(self.path, "Scan000", middle, middle + 600, cards=self.cards)
+
+
+class Hdf5Campaign:
+
+    """utilities.load_campaign on a folder of synthetic PyMoDAQ files, against a file by file loop"""
+
+    params = SAMPLES[1:]
+    param_names = ["samples"]
+
+    def setup_cache(self):
+        # One folder of CAMPAIGN_FILES files per number of samples, removed by asv as for Hdf5Loading
+        require_h5py()
+        folders = {}
+        for nb_samples in self.params:
+            folders[nb_samples] = os.path.abspath(f"campaign_{nb_samples}")
+            os.mkdir(folders[nb_samples])
+            for index in range(CAMPAIGN_FILES):
+                write_pymodaq_h5(os.path.join(folders[nb_samples], f"scan_{index:02d}.h5"), nb_samples)
+        return folders
+
+    def setup(self, folders, nb_samples):
+        require_h5py()
+        self.folder = folders[nb_samples]
+        self.cards = [f"CH{card:02d}" for card in range(CARDS)]
+
+    def time_load_campaign(self, folders, nb_samples):
+        import utilities
+        utilities.load_campaign(self.folder)
+
+    def time_file_by_file(self, folders, nb_samples):
+        import utilities
+        for path in utilities.find_h5_files(self.folder):
+            utilities.h5py_to_dataframe(path, "Scan000", "Detector000", "NavAxes", "Data0D", self.cards)
+
+
+# Standalone runner
+
+
+def run(name_filter: str = "", repeat: int = 3):
+
+    """Run every time_* benchmark, print its best wall time and tracemalloc peak"""
+
+    print(f"{'benchmark':<60} {'best time':>12} {'peak memory':>14}")
+    for cls in (ConfigGeneration, GuiSaveTheList, GuiStartup, Hdf5Loading, Hdf5Campaign):
+        labels = [f"{cls.__name__}.{name}({param})" for param in cls.params for name in dir(cls)
+                  if name.startswith(("time_", "timeraw_", "track_"))]
+        if not any(name_filter in label for label in labels):
+            continue
+        with cache_of(cls) as cache:
+            run_class(cls, cache, name_filter, repeat)
+
+
+@contextlib.contextmanager
+def cache_of(cls):
+
+    """Run a class's setup_cache in a temporary working directory as asv does, yield (its result,) or ()
+
+    The directory is removed once the class's benchmarks are done."""
+
+    if not hasattr(cls, "setup_cache"):
+        yield ()
+        return
+    cwd = os.getcwd()
+    folder = tempfile.mkdtemp(prefix="tgpa_bench_")
+    try:
+        os.chdir(folder)
+        try:
+            cache = (cls().setup_cache(),)
+        except NotImplementedError as reason:
+            print(f"{cls.__name__:<60} skipped : {reason}")
+            cache = None
+        yield cache
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def run_class(cls, cache, name_filter: str, repeat: int):
+
+    """Run the benchmarks of a class matching a filter, cache being the arguments given by setup_cache"""
+
+    if cache is None:  # Skipped by its setup_cache
+        return
+    for param in cls.params:
+        for method_name in [name for name in dir(cls) if name.startswith(("timeraw_", "track_"))]:
+            label = f"{cls.__name__}.{method_name}({param})"
+            if name_filter in label:
+                print(f"{label:<60} {run_in_interpreter(getattr(cls(), method_name), param, repeat)}")
+        for method_name in [name for name in dir(cls) if name.startswith("time_")]:
+            label = f"{cls.__name__}.{method_name}({param})"
+            if name_filter not in label:
+                continue
+            args = cache + (param,)
+            benchmark = cls()
+            try:
+                benchmark.setup(*args)
+            except NotImplementedError as reason:
+                print(f"{label:<60} skipped : {reason}")
+                break
+            method = getattr(benchmark, method_name)
+
+            try:
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    method(*args)
+                    times.append(time.perf_counter() - start)
+
+                tracemalloc.start()
+                method(*args)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            finally:
+                if hasattr(benchmark, "teardown"):
+                    benchmark.teardown(*args)
+            print(f"{label:<60} {min(times) * 1000:9.2f} ms {peak / 2 ** 20:10.2f} MiB")
+
+
+def run_in_interpreter(method, param, repeat: int):
+
+    """Run a timeraw_* benchmark (best time of a fresh interpreter) or a track_* one (its value)"""
+
+    if method.__name__.startswith("track_"):
+        return f"{method(param):>12} {getattr(method, 'unit', '')}"
+    code, setup = method(param)
+    script = (f"import time\n{setup}\nstart = time.perf_counter()\n{code}\n"
+              f"print(time.perf_counter() - start)")
+    times = [float(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                  check=True).stdout) for _ in range(repeat)]
+    return f"{min(times) * 1000:9.2f} ms"
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:2])
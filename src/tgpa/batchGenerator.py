@@ -0,0 +1,178 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Generate the tolm files of many test benches at once, without any GUI
+
+A manifest (toml or json) lists the benches to generate :
+
+    [defaults]                      # Optional, shared by every bench
+    rsrc_name = "ASRL7::INSTR"
+
+    [[bench]]
+    channel_map = "bench01.csv"     # Relative to the manifest
+    output = "out/bench01.toml"     # Relative to the manifest
+    rsrc_name = "ASRL3::INSTR"      # Optional, overrides defaults
+    label = "Bench 1"               # Keys which are not settings of the instrument are ignored
+
+Each bench's channel map is either
+    - a csv file with the columns module, number, info, channel, sensor (one row per channel)
+    - a toml/json file with a "modules" list of {name, number, info, frtd, tc, Volt} tables
+      and optional "keithley" and "sensors_settings" tables
+
+Usage : tgpa manifest.toml [-j WORKERS]
+"""
+
+# Imports
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import toml
+
+# The sources are flat scripts importing each other by name, also when the tgpa entry point
+# runs this one from the installed package
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from keithleyDataClass import Keithley2700, DEFAULT_KEITHLEY_SETTINGS, DEFAULT_SENSORS_SETTINGS  # noqa: E402
+
+# Sensor names accepted in the channel maps -> names used by ModuleKeithley.config_channel
+SENSORS = {"frtd": "frtd", "tc": "tc", "volt": "Volt"}
+# Keys of a bench (or of its defaults) given to the instrument, the others (e.g a label) are ignored
+KEITHLEY_KEYS = tuple(DEFAULT_KEITHLEY_SETTINGS) + ("sensors_settings",)
+# Keys every bench must have
+BENCH_KEYS = ("channel_map", "output")
+
+
+# Functions definitions
+
+
+def read_structured_file(path: str):
+
+    """Read a toml or json file into a dictionary"""
+
+    with open(path, "r") as f:
+        if path.lower().endswith(".json"):
+            return json.load(f)
+        return toml.load(f)
+
+
+def read_channel_map(path: str):
+
+    """Read a bench's channel map into a dictionary with a "modules" list"""
+
+    if not path.lower().endswith(".csv"):
+        return read_structured_file(path)
+
+    modules = {}  # Module name -> module table, in the order of first appearance
+    with open(path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            name = row["module"].strip()
+            if name not in modules:
+                modules[name] = {"name": name, "number": row["number"].strip(), "info": row.get("info", "").strip(),
+                                 "frtd": [], "tc": [], "Volt": []}
+            modules[name][SENSORS[row["sensor"].strip().lower()]].append(row["channel"].strip())
+    return {"modules": list(modules.values())}
+
+
+def build_keithley(channel_map: dict, settings: dict = None):
+
+    """Build a Keithley2700 from a channel map, completing its settings with the defaults"""
+
+    keithley_settings = dict(DEFAULT_KEITHLEY_SETTINGS)
+    keithley_settings.update(settings or {})
+    keithley_settings.update(channel_map.get("keithley", {}))
+    keithley_settings = {key: value for key, value in keithley_settings.items() if key in KEITHLEY_KEYS}
+    sensors_settings = keithley_settings.pop("sensors_settings", None) or DEFAULT_SENSORS_SETTINGS
+    sensors_settings = channel_map.get("sensors_settings", sensors_settings)
+
+    instrument = Keithley2700(sensors_settings=sensors_settings, **keithley_settings)
+    for module in channel_map.get("modules", []):
+        instrument.add_module(name=module["name"], number=str(module["number"]), info=module.get("info", ""))
+        instrument.modules[-1].config_all_channels([str(chan) for chan in module.get("frtd", [])],
+                                                   [str(chan) for chan in module.get("tc", [])],
+                                                   [str(chan) for chan in module.get("Volt", [])])
+    return instrument
+
+
+def generate_bench(bench: dict):
+
+    """Generate one bench's tolm file, return (output, elapsed time, written, error message or None)
+
+    The file is left untouched when its content did not change."""
+
+    start = time.perf_counter()
+    missing = [key for key in BENCH_KEYS if key not in bench]
+    if missing:
+        return bench.get("output"), time.perf_counter() - start, False, "Missing " + ", ".join(missing)
+    try:
+        settings = {key: value for key, value in bench.items() if key in KEITHLEY_KEYS}
+        instrument = build_keithley(read_channel_map(bench["channel_map"]), settings)
+        output_dir = os.path.dirname(bench["output"])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        written = instrument.update_tolm(bench["output"])
+    except Exception as error:  # Reported in the summary, one bench must not stop the others
+        return bench.get("output"), time.perf_counter() - start, False, f"{type(error).__name__}: {error}"
+    return bench["output"], time.perf_counter() - start, written, None
+
+
+def read_manifest(manifest_path: str):
+
+    """Get the benches of a manifest, with their defaults applied and their paths made absolute
+
+    A bench without a channel map or an output is kept as it is : generate_bench reports it."""
+
+    manifest = read_structured_file(manifest_path)
+    root = os.path.dirname(os.path.abspath(manifest_path))
+    benches = []
+    for bench in manifest.get("bench", []):
+        full_bench = dict(manifest.get("defaults", {}))
+        full_bench.update(bench)
+        for key in BENCH_KEYS:
+            if key in full_bench:
+                full_bench[key] = os.path.join(root, full_bench[key])
+        benches.append(full_bench)
+    return benches
+
+
+def generate_benches(benches: list, workers: int = None):
+
+    """Generate the benches' tolm files across a process pool, return the results in the benches order"""
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(generate_bench, benches))
+
+
+def main(argv=None):
+
+    """Console entry point : generate every bench of a manifest and print a summary"""
+
+    parser = argparse.ArgumentParser(prog="tgpa", description="Generate PyMoDAQ Keithley tolm files from a manifest")
+    parser.add_argument("manifest", help="toml or json manifest listing the benches")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of processes (default : all CPUs)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = generate_benches(read_manifest(args.manifest), args.workers)
+
+    failures = unchanged = 0
+    for index, (output, elapsed, written, error) in enumerate(results):
+        output = output or f"bench {index + 1} of the manifest"
+        if error is not None:
+            failures += 1
+            print(f"FAIL  {elapsed * 1000:8.1f} ms  {output} : {error}")
+        elif written:
+            print(f"OK    {elapsed * 1000:8.1f} ms  {output}")
+        else:
+            unchanged += 1
+            print(f"SAME  {elapsed * 1000:8.1f} ms  {output}")
+    print(f"{len(results) - failures - unchanged} generated, {unchanged} unchanged, {failures} failed "
+          f"in {time.perf_counter() - start:.2f} s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
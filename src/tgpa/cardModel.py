@@ -0,0 +1,138 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Keep what a card's tab describes out of the widgets
+"""
+
+# Constants
+SENSOR_TYPES = ("Frtd", "Tc", "Volt")  # Sensors of a card, as named in the GUI
+CARD_FIELDS = ("name", "number", "info")  # Editable settings of a card
+
+
+# Classes definitions
+
+
+class CardModel:
+
+    """Card data object : settings and checked channels of a GUI tab, without any widget
+
+    Every change goes through assign / assign_many / set_field, which keep the
+    per-card indexes up to date and notify the listeners with the list of
+    (key, old value, new value) changes, key being a channel number ("channels"
+    changes) or a field name ("settings" changes)."""
+
+    def __init__(self, name: str = "", number: str = "", info: str = "", channels: list = None):
+        self.name = name  # Card name (e.g : MODULE01)
+        self.number = number  # Card number (e.g : 7706)
+        self.info = info  # Card info
+        self.channels = list(channels or [])  # Channel numbers offered by the card
+        self.positions = {channel: row for row, channel in enumerate(self.channels)}  # Channel -> row
+        self.assignment = {}  # Channel -> sensor, one sensor per channel
+        self.selections = {sensor: set() for sensor in SENSOR_TYPES}  # Sensor -> checked channels
+        self.listeners = []  # Called with (card, kind, changes) after every change
+        self._settings = None  # Cached data_settings entry, dropped on change
+
+    def sensor_of(self, channel: str):
+
+        """Get the sensor a channel is checked for, None if it is not checked"""
+
+        return self.assignment.get(channel)
+
+    def assign(self, channel: str, sensor):
+
+        """Check a channel for a sensor (None to uncheck it), unchecking it for any other sensor"""
+
+        self.assign_many({channel: sensor})
+
+    def assign_many(self, assignment: dict):
+
+        """Apply {channel: sensor or None} at once, with a single notification"""
+
+        changes = []
+        for channel, sensor in assignment.items():
+            old = self.assignment.get(channel)
+            if old == sensor or channel not in self.positions:
+                continue
+            if old is not None:
+                self.selections[old].discard(channel)
+                del self.assignment[channel]
+            if sensor is not None:
+                self.selections[sensor].add(channel)
+                self.assignment[channel] = sensor
+            changes.append((channel, old, sensor))
+        if changes:
+            self._notify("channels", changes)
+
+    def set_column(self, sensor: str, checked: bool):
+
+        """Check (or uncheck) every channel of the card for a sensor"""
+
+        if checked:
+            self.assign_many({channel: sensor for channel in self.channels})
+        else:
+            self.assign_many({channel: None for channel in self.selections[sensor]})
+
+    def set_field(self, field: str, value: str):
+
+        """Change one of the card's settings (name, number or info)"""
+
+        old = getattr(self, field)
+        if old != value:
+            setattr(self, field, value)
+            self._notify("settings", [(field, old, value)])
+
+    def _notify(self, kind: str, changes: list):
+
+        """Drop the cached entry and tell the listeners what changed"""
+
+        self._settings = None
+        for listener in list(self.listeners):
+            listener(self, kind, changes)
+
+    def checked(self, sensor: str):
+
+        """Get the checked channels of a sensor, in the card's channels order"""
+
+        return sorted(self.selections[sensor], key=self.positions.__getitem__)
+
+    def template(self):
+
+        """Get the card's sensor map as a template : number, info and the checked positions per sensor
+
+        Positions (0 for the card's first channel) rebase the template on any slot."""
+
+        template = {"number": self.number, "info": self.info}
+        for sensor in SENSOR_TYPES:
+            template[sensor] = sorted(self.positions[channel] for channel in self.selections[sensor])
+        return template
+
+    def apply_template(self, template: dict):
+
+        """Check the channels of a template (and only them) and take its number,
+        with one notification per kind of change"""
+
+        assignment = dict.fromkeys(self.assignment)  # Unchecked unless the template checks them
+        for sensor in SENSOR_TYPES:
+            for position in template.get(sensor, ()):
+                if position < len(self.channels):
+                    assignment[self.channels[position]] = sensor
+        self.assign_many(assignment)
+        if "number" in template:
+            self.set_field("number", template["number"])
+
+    def clone(self, name: str, channels: list):
+
+        """Get a copy of the card under another name, rebased on other channels (e.g another slot)"""
+
+        card = CardModel(name, info=self.info, channels=channels)
+        card.apply_template(self.template())
+        return card
+
+    def to_settings(self):
+
+        """Get the card as an entry of MainWindow.data_settings, only computed again after a change"""
+
+        if self._settings is None:
+            self._settings = {sensor: self.checked(sensor) for sensor in SENSOR_TYPES}
+            self._settings["settings"] = {"name": self.name, "number": self.number, "info": self.info}
+        return self._settings
@@ -0,0 +1,182 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Check the cards' channels assignments live, while the user checks them
+"""
+
+# Imports
+from keithleyDataClass import channel_bit, channels_to_mask, mask_to_channels, sensor_conflicts
+from cardModel import CardModel, SENSOR_TYPES
+
+# Constants
+# Number of channels of the Keithley switching cards, the others are not checked
+CARD_MODELS_CHANNELS = {"7700": 20, "7701": 32, "7702": 40, "7703": 32, "7706": 20, "7708": 40, "7710": 20}
+CONFLICTS_MESSAGES = {("Frtd", "Tc"): " est assigné à un frtd et à au moins un thermocouple.",
+                      ("Frtd", "Volt"): " est assigné à un frtd et à au moins un autre capteur.",
+                      ("Tc", "Volt"): " est assigné à un thermocouple et à au moins à un autre capteur."}
+
+
+# Classes definitions
+
+
+class CardState:
+
+    """Bitsets of a card, kept up to date change by change (bit n for channel n)"""
+
+    __slots__ = ("masks", "range_mask", "conflicts", "out_of_range", "summary")
+
+    def __init__(self, card: CardModel):
+        self.masks = {sensor: channels_to_mask(card.selections[sensor]) for sensor in SENSOR_TYPES}
+        self.range_mask = 0  # Channels the card really has
+        self.conflicts = {}  # (sensor1, sensor2) -> channels given to both
+        self.out_of_range = 0  # Checked channels the card does not have
+        self.summary = None  # What the tab shows, listeners are only called when it changes
+
+
+class AssignmentValidator:
+
+    """Validation engine of the cards : duplicate assignments, thermocouples without
+    frtd, channels out of the card's range and duplicate module names
+
+    It follows the cards' changes (see CardModel.listeners) and only looks at the
+    changed channels, so a check costs the same whatever the number of channels.
+    Listeners are called with the card when the issues of a card change."""
+
+    def __init__(self):
+        self.states = {}  # CardModel -> CardState
+        self.names = {}  # Module name -> cards named so
+        self.listeners = []
+
+    def add_card(self, card: CardModel):
+
+        """Follow a card's changes, without notifying the listeners of its first state"""
+
+        self.states[card] = CardState(card)
+        self.states[card].range_mask = self.range_mask(card)
+        card.listeners.insert(0, self.card_changed)  # Before the views, they repaint with up to date issues
+        self._add_name(card, card.name)
+        self._update(card, notify=False)
+
+    def remove_card(self, card: CardModel):
+
+        """Stop following a card"""
+
+        if self.card_changed in card.listeners:
+            card.listeners.remove(self.card_changed)
+        del self.states[card]
+        self._remove_name(card, card.name)
+
+    def card_changed(self, card: CardModel, kind: str, changes: list):
+
+        """Update a card's bitsets with the changes of its channels or of its settings"""
+
+        state = self.states[card]
+        if kind == "channels":
+            for channel, old, new in changes:
+                bit = channel_bit(channel)
+                if old is not None:
+                    state.masks[old] &= ~bit
+                if new is not None:
+                    state.masks[new] |= bit
+        else:
+            for field, old, new in changes:
+                if field == "name":
+                    self._remove_name(card, old)
+                    self._add_name(card, new)
+                elif field == "number":
+                    state.range_mask = self.range_mask(card)
+        self._update(card)
+
+    @staticmethod
+    def range_mask(card: CardModel):
+
+        """Get the bitset of the channels a card has, according to its number (e.g : 20 for a 7706)"""
+
+        nb_channels = CARD_MODELS_CHANNELS.get(card.number.strip())
+        if nb_channels is None or not card.channels:  # Unknown card : every channel of the tab is allowed
+            return channels_to_mask(card.channels)
+        slot = int(card.channels[0]) // 100
+        return ((1 << nb_channels) - 1) << (slot * 100 + 1)
+
+    def _add_name(self, card: CardModel, name: str):
+        cards = self.names.setdefault(name, set())
+        cards.add(card)
+        if len(cards) == 2:  # The other card just got a duplicate too
+            for other in cards - {card}:
+                self._update(other)
+
+    def _remove_name(self, card: CardModel, name: str):
+        cards = self.names[name]
+        cards.discard(card)
+        if len(cards) == 1:  # The remaining card has no duplicate anymore
+            for other in cards:
+                self._update(other)
+        elif not cards:
+            del self.names[name]
+
+    def _update(self, card: CardModel, notify: bool = True):
+
+        """Derive a card's issues from its bitsets and notify the listeners if they changed"""
+
+        state = self.states[card]
+        state.conflicts = sensor_conflicts(state.masks)
+        state.out_of_range = (state.masks["Frtd"] | state.masks["Tc"] | state.masks["Volt"]) & ~state.range_mask
+        # The bitsets themselves : one more conflicting or missing channel changes the messages too
+        summary = (tuple(state.conflicts.items()), self.tc_without_frtd(card), state.out_of_range,
+                   self.duplicate_name(card), state.range_mask)
+        if summary != state.summary:
+            state.summary = summary
+            if notify:
+                for listener in list(self.listeners):
+                    listener(card)
+
+    def has_issues(self, card: CardModel):
+
+        """Tell if a card has any issue, without building the messages"""
+
+        return any(self.states[card].summary[:4])
+
+    def tc_without_frtd(self, card: CardModel):
+
+        """Tell if thermocouples are checked on a card without any frtd"""
+
+        masks = self.states[card].masks
+        return bool(masks["Tc"]) and not masks["Frtd"]
+
+    def duplicate_name(self, card: CardModel):
+
+        """Tell if another card has the same module name"""
+
+        return len(self.names.get(card.name, ())) > 1
+
+    def channel_issue(self, card: CardModel, channel: str):
+
+        """Get the issue of a channel (to highlight it), None if it has none"""
+
+        state = self.states[card]
+        bit = channel_bit(channel)
+        for sensors, mask in state.conflicts.items():
+            if mask & bit:
+                return "Le canal " + channel + CONFLICTS_MESSAGES[sensors]
+        if state.out_of_range & bit:
+            return "Le canal " + channel + " n'existe pas sur une carte " + card.number
+        if state.masks["Tc"] & bit and self.tc_without_frtd(card):
+            return "Des thermocouples sont renseignés sans Frtd"
+        return None
+
+    def issues(self, card: CardModel):
+
+        """Get the messages describing every issue of a card"""
+
+        state = self.states[card]
+        messages = []
+        if self.duplicate_name(card):
+            messages.append("Le nom " + card.name + " est donné à plusieurs cartes")
+        if self.tc_without_frtd(card):
+            messages.append("Des thermocouples sont renseignés sans Frtd")
+        for sensors, mask in state.conflicts.items():
+            messages.extend("Le canal " + channel + CONFLICTS_MESSAGES[sensors] for channel in mask_to_channels(mask))
+        if state.out_of_range:
+            messages.append("Les canaux " + ", ".join(mask_to_channels(state.out_of_range)) +
+                            " n'existent pas sur une carte " + card.number)
+        return messages
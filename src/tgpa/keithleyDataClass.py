@@ -4,15 +4,57 @@ Date : 20/09/2024
 Objective : Get user's keithley information
 """
 # Imports
+import hashlib
+import os
+import re
+import shutil
 import toml
+from numbers import Integral
+
+# Constants
+TOLM_TITLE = "this is the configuration file of the Keithley plugin"
+KEITHLEY_27XX_TITLE = "Configuration entry for a Keithley 27XX Multimeter/Switch System"
+_BARE_KEY = re.compile(r'^[A-Za-z0-9_-]+$')  # Keys toml.dump writes without quotes
+_ENCODER = toml.TomlEncoder()
+CARD_CHANNELS = 40  # Number of channels of a switching card (7702, 7706, ...)
+SENSORS = ("frtd", "tc", "Volt")  # Sensors known by ModuleKeithley.config_channel
+
+# Default instrument and sensors settings (the ones of my application, change them if needed)
+DEFAULT_KEITHLEY_SETTINGS = {"name": "INSTRUMENT01",
+                             "title": "Instrument in wich is plugged the switching module used for data acquisition",
+                             "rsrc_name_example": ["ASRL1::INSTR", "TCPIP::192.168.01.01::1394::SOCKET"],
+                             "rsrc_name": "ASRL7::INSTR",
+                             "model_name": "2701",
+                             "panel": "rear",
+                             "termination_character": "Keithley must be set to LF"}
+DEFAULT_SENSORS_SETTINGS = {'Frtd': {'mode': 'temp',
+                                     'transducer': 'frtd',
+                                     'type': 'pt100',
+                                     'resolution': '6',
+                                     'nplc': '5'},
+                            'Tc': {'mode': 'temp',
+                                   'transducer': 'tc',
+                                   'type': 'K',
+                                   'ref_junc': 'ext',
+                                   'resolution': '6',
+                                   'nplc': '5'},
+                            'Volt': {'mode': 'Volt:dc'}}
 
 # Classes definitions
 
 
+class GenerationCancelled(Exception):
+
+    """Raised when the generation of a tolm file is cancelled, the deployed file being left untouched"""
+
+
 class Channel:
 
     """Channel data object"""
 
+    # No per-instance __dict__ : large channel maps hold thousands of these
+    __slots__ = ("number", "mode", "transducer", "type", "ref_junc", "resolution", "nplc")
+
     def __init__(self, number: str, mode: str, transducer=None, type=None, ref_junc=None, resolution=None, nplc=None):
         self.number = number
         self.mode = mode
@@ -22,57 +64,313 @@ class Channel:
         self.resolution = resolution
         self.nplc = nplc
 
+    def to_dict(self):
+
+        """Get the channel's table as written in the tolm file"""
+
+        match self.transducer:
+            case "tc":
+                return {"mode": str(self.mode),
+                        "transducer": str(self.transducer),
+                        "type": str(self.type),
+                        "ref_junc": str(self.ref_junc),
+                        "resolution": str(self.resolution),
+                        "nplc": str(self.nplc)}
+            case "frtd":
+                return {"mode": str(self.mode),
+                        "transducer": str(self.transducer),
+                        "type": str(self.type),
+                        "resolution": str(self.resolution),
+                        "nplc": str(self.nplc)}
+            case _:
+                return {"mode": str(self.mode)}
+
+
+class SensorProfile:
+
+    """Sensor settings, parsed and validated once, shared by every channel using this sensor"""
+
+    __slots__ = ("sensor", "mode", "transducer", "type", "ref_junc", "resolution", "nplc")
+
+    def __init__(self, sensor: str, mode: str, transducer=None, type=None, ref_junc=None, resolution=None, nplc=None):
+        self.sensor = sensor
+        self.mode = mode
+        self.transducer = transducer
+        self.type = type
+        self.ref_junc = ref_junc
+        self.resolution = resolution
+        self.nplc = nplc
+
+    @classmethod
+    def from_settings(cls, sensor: str, settings: dict):
+
+        """Parse a sensor's settings (as given by the GUI's SensorsDialog) into a profile"""
+
+        try:
+            match sensor:
+                case "frtd":
+                    return cls(sensor, settings['mode'], settings['transducer'], settings['type'],
+                               resolution=int(settings['resolution']), nplc=int(settings['nplc']))
+                case "tc":
+                    # The nplc of thermocouples is not used by the channels (written as "None")
+                    return cls(sensor, settings['mode'], settings['transducer'], settings['type'],
+                               ref_junc=settings['ref_junc'], resolution=int(settings['resolution']))
+                case "Volt":
+                    return cls(sensor, settings['mode'])
+        except (KeyError, ValueError) as error:
+            raise ValueError(f"Invalid {sensor} settings : {error!r}") from error
+        raise ValueError(f"Unknown sensor {sensor}")
+
+    def key(self):
+
+        """Get the profile's values, identical for identical profiles"""
+
+        return (self.sensor, self.mode, self.transducer, self.type, self.ref_junc, self.resolution, self.nplc)
+
+    def channel(self, nb_channel: str):
+
+        """Get a channel configured with this profile"""
+
+        return Channel(nb_channel, self.mode, self.transducer, self.type, self.ref_junc, self.resolution, self.nplc)
+
 
 class ModuleKeithley:
 
     """Module data object"""
 
-    def __init__(self, name: str, number: str, info: str, sensors_settings: dict):
+    def __init__(self, name: str, number: str, info: str, sensors_settings: dict, slot: int = None,
+                 profiles: dict = None):
         self.name = name  # Module name
         self.number = number  # Card number
         self.info = info  # Module info
-        self.channels = []  # Initialization of the module's used channel
+        self.slot = slot  # Slot of the card in the Keithley (2 for channels 201 to 240), deduced if None
+        self._channels = []  # Initialization of the module's used channel
+        self._channel_index = {}  # Channel number -> Channel, for O(1) lookups
+        self._raw_channels = None  # Channels tables read from a tolm file, turned into Channel objects on demand
+        self._sensor_masks = {sensor: 0 for sensor in SENSORS}  # Sensor -> bitset of its channels
         self.sensors_settings = sensors_settings
+        # Sensor -> SensorProfile, usually shared with the instrument and its other modules
+        self.profiles = profiles if profiles is not None else parse_sensor_profiles(sensors_settings)
+        self._version = 0  # Incremented on every change of the channels, see Keithley2700.render_state
+
+    def __getattr__(self, name):
+
+        """Give access to a channel as an attribute (e.g : module.c201)"""
+
+        # Only called when the normal lookup failed, hence never for real attributes
+        if name.startswith("c") and "_raw_channels" in self.__dict__:
+            self._materialize()
+            if name[1:] in self._channel_index:
+                return self._channel_index[name[1:]]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def channels(self):
+
+        """Configured channels, in the order they were configured"""
+
+        self._materialize()
+        return self._channels
+
+    def load_channels(self, tables: dict):
+
+        """Give the module the channels tables of a tolm file ({number: {mode, transducer, ...}})
+
+        The Channel objects are only created when the channels are accessed, so a
+        module which is only written back never builds them."""
+
+        if self.channel_count():
+            raise ValueError(f"Module {self.name} already has channels")
+        self._raw_channels = tables
+        if self.slot is None:
+            numbers = [number for number in tables if str(number).isdigit()]
+            if numbers:
+                self.slot = int(numbers[0]) // 100
+        self._version += 1
+
+    def _materialize(self):
+
+        """Create the Channel objects of the channels tables read from a tolm file"""
+
+        if self._raw_channels is None:
+            return
+        tables, self._raw_channels = self._raw_channels, None
+        for number, table in tables.items():
+            self.add_channel(Channel(str(number), table.get("mode"), table.get("transducer"), table.get("type"),
+                                     table.get("ref_junc"), table.get("resolution"), table.get("nplc")))
+            sensor = table.get("transducer") if table.get("transducer") in ("frtd", "tc") else "Volt"
+            self._sensor_masks[sensor] |= channel_bit(number)
+
+    def channel_count(self):
+
+        """Get the number of configured channels, without creating the Channel objects"""
+
+        if self._raw_channels is not None:
+            return len(self._raw_channels)
+        return len(self._channels)
+
+    def sensor_channels(self):
+
+        """Get the configured channel numbers of each sensor, without creating the Channel objects"""
+
+        numbers = {sensor: [] for sensor in SENSORS}
+        if self._raw_channels is not None:
+            for number, table in self._raw_channels.items():
+                transducer = table.get("transducer")
+                numbers[transducer if transducer in ("frtd", "tc") else "Volt"].append(str(number))
+        else:
+            for chan in self._channels:
+                numbers[chan.transducer if chan.transducer in ("frtd", "tc") else "Volt"].append(str(chan.number))
+        return numbers
+
+    def channel_tables(self):
+
+        """Yield (number, table) for each channel, as written in the tolm file
+
+        Channels read from a tolm file and never accessed are written back as read,
+        without creating the Channel objects."""
+
+        if self._raw_channels is not None:
+            for number, table in self._raw_channels.items():
+                yield str(number), {key: str(value) for key, value in table.items()}
+        else:
+            for chan in self._channels:
+                yield str(chan.number), chan.to_dict()
+
+    def get_channel(self, nb_channel: str):
+
+        """Get a configured channel from its number, None if it is not configured"""
+
+        self._materialize()
+        return self._channel_index.get(str(nb_channel))
+
+    def add_channel(self, channel: Channel):
+
+        """Register a channel in the module, refusing a channel number used twice"""
+
+        self._materialize()
+        number = str(channel.number)
+        if number in self._channel_index:
+            raise ValueError(f"Channel {number} is already configured in module {self.name}")
+        self._channels.append(channel)
+        self._channel_index[number] = channel
+        if self.slot is None and number.isdigit():
+            self.slot = int(number) // 100
+        self._version += 1
+
+    def mark_dirty(self):
+
+        """Tell the module its channels changed (to call after editing one of its Channel objects in place)"""
+
+        self._version += 1
+
+    def header_section(self, instrument_name: str):
+
+        """Get the module's own section of the tolm file"""
+
+        return tolm_section(("Keithley", "27XX", instrument_name, self.name), self.header_dict())
+
+    def iter_channel_sections(self, instrument_name: str):
+
+        """Yield the module's channels sections of the tolm file, one by one"""
+
+        path = ("Keithley", "27XX", instrument_name, self.name)
+        if self.channel_count():
+            for number, table in self.channel_tables():
+                yield tolm_section(path + ("CHANNELS", number), table)
+        else:  # toml.dump only writes a CHANNELS table by itself when it has no channel in it
+            yield tolm_section(path + ("CHANNELS",), {})
+
+    def sensor_profile(self, sensor: str):
+
+        """Get the SensorProfile of a sensor, None for an unknown sensor"""
+
+        if sensor in SENSORS and sensor not in self.profiles:
+            raise KeyError(f"No settings given for the sensor {sensor}")
+        return self.profiles.get(sensor)
 
     def config_channel(self, nb_channel: str, sensor: str):
 
         """Config a module's channel"""
 
-        match sensor:
-            case "frtd":
-                self.channels.append(Channel(nb_channel, self.sensors_settings['Frtd']['mode'],
-                                             self.sensors_settings['Frtd']['transducer'],
-                                             self.sensors_settings['Frtd']['type'],
-                                             resolution=int(self.sensors_settings['Frtd']['resolution']),
-                                             nplc=int(self.sensors_settings['Frtd']['nplc'])))
-                self.__setattr__("c" + nb_channel, self.channels[-1])
+        profile = self.sensor_profile(sensor)
+        bit = channel_bit(nb_channel)  # Checked before the channel is added, the bitsets stay in sync
+        if profile is not None:
+            self.add_channel(profile.channel(nb_channel))
+            self._sensor_masks[sensor] |= bit
 
-            case "tc":
-                self.channels.append(Channel(nb_channel, self.sensors_settings['Tc']['mode'],
-                                             self.sensors_settings['Tc']['transducer'],
-                                             self.sensors_settings['Tc']['type'],
-                                             ref_junc=self.sensors_settings['Tc']['ref_junc'],
-                                             resolution=int(self.sensors_settings['Tc']['resolution'])))
-                                             
-                self.__setattr__("c" + nb_channel, self.channels[-1])
-
-            case "Volt":
-                self.channels.append(Channel(nb_channel, self.sensors_settings['Volt']['mode']))
-                self.__setattr__("c" + nb_channel, self.channels[-1])
+    def config_channels(self, channels, sensor: str):
+
+        """Config many module's channels with the same sensor at once
+
+        channels can be a range string ("213-228", "201,203,210-215"), a list of
+        channel numbers, a boolean mask over the card's channels (list or NumPy
+        array, index 0 being channel 1) or an int bitset over the card's channels
+        (bit 0 being channel 1). Nothing is configured if any of the channels is
+        given twice or already in use in the module."""
+
+        numbers = parse_channel_spec(channels, self.slot)
+        mask = duplicates = 0
+        for nb_channel in numbers:
+            bit = channel_bit(nb_channel)
+            duplicates |= mask & bit
+            mask |= bit
+        if duplicates:
+            raise ValueError(f"Channels {', '.join(mask_to_channels(duplicates))} are given twice")
+        conflicts = mask & self.used_mask()
+        if conflicts:
+            raise ValueError(f"Channels {', '.join(mask_to_channels(conflicts))} are already configured "
+                             f"in module {self.name}")
+
+        profile = self.sensor_profile(sensor)
+        if profile is not None:
+            for number in numbers:
+                self.add_channel(profile.channel(number))
+            self._sensor_masks[sensor] |= mask
+
+    def sensor_mask(self, sensor: str):
+
+        """Get the bitset of the channels configured with a sensor (bit n set for channel n)"""
+
+        self._materialize()
+        return self._sensor_masks[sensor]
+
+    def used_mask(self):
+
+        """Get the bitset of all the configured channels (bit n set for channel n)"""
+
+        self._materialize()
+        return self._sensor_masks["frtd"] | self._sensor_masks["tc"] | self._sensor_masks["Volt"]
+
+    def header_dict(self):
+
+        """Get the module's own table (without its channels) as written in the tolm file"""
+
+        return {"module_name": str(self.number), "info": str(self.info)}
+
+    def to_dict(self):
+
+        """Get the module's table, channels included"""
+
+        module = self.header_dict()
+        module["CHANNELS"] = {str(chan.number): chan.to_dict() for chan in self.channels}
+        return module
 
     def config_all_channels(self, Lfrtd:list, Ltc:list, LVolt:list):
 
         """Config all the modules channels"""
 
-        [self.config_channel(nb_channel=chan, sensor="frtd")
-         for chan in Lfrtd
-         if len(Lfrtd) > 0]
-        [self.config_channel(nb_channel=chan, sensor="tc")
-         for chan in Ltc
-         if len(Ltc) > 0]
-        [self.config_channel(nb_channel=chan, sensor="Volt")
-         for chan in LVolt
-         if len(LVolt) > 0]
+        # Refuse the whole configuration if a channel is given to several sensors
+        conflicts = sensor_conflicts({"frtd": channels_to_mask(Lfrtd),
+                                      "tc": channels_to_mask(Ltc),
+                                      "Volt": channels_to_mask(LVolt)})
+        for (sensor1, sensor2), mask in conflicts.items():
+            raise ValueError(f"Channels {', '.join(mask_to_channels(mask))} are given both to {sensor1} "
+                             f"and {sensor2} in module {self.name}")
+
+        self.config_channels(Lfrtd, "frtd")
+        self.config_channels(Ltc, "tc")
+        self.config_channels(LVolt, "Volt")
 
 
 class Keithley2700:
@@ -80,8 +378,7 @@ class Keithley2700:
     """Keithley data object"""
 
     def __init__(self, name, title, rsrc_name_example, rsrc_name,
-                 model_name, panel, termination_character, sensors_settings):
-        self.tolm = f""""""
+                 model_name, panel, termination_character, sensors_settings, profiles=None):
         self.name = name
         self.title = title
         self.rsrc_name_example = rsrc_name_example
@@ -90,76 +387,484 @@ class Keithley2700:
         self.panel = panel
         self.termination_character = termination_character
         self.sensors_settings = sensors_settings
+        # Sensors settings parsed once and shared by all the modules
+        self.profiles = profiles if profiles is not None else parse_sensor_profiles(sensors_settings)
         self.modules = []
+        # Output path -> (file stat, content hash, render state, spans of the modules) of the last update_tolm
+        self._written = {}
 
-    def add_module(self, name, number, info):
+    def add_module(self, name, number, info, slot=None):
 
         """Add a module to the object Keithley"""
 
-        self.modules.append(ModuleKeithley(name, number, info, self.sensors_settings))  # Get the new module in a list
+        self.modules.append(ModuleKeithley(name, number, info, self.sensors_settings, slot,
+                                           self.profiles))  # Get the new module in a list
         self.__setattr__(name, self.modules[-1])  # Give the module as an attribute to the Keithley
 
+    @classmethod
+    def from_dict(cls, config: dict, name: str = None, interned: dict = None):
+
+        """Rebuild an instrument from the dictionary of a tolm file (the first instrument if name is None)
+
+        With an interning table (see parse_sensor_profiles), its sensors profiles are shared."""
+
+        instruments = {key: value for key, value in config["Keithley"]["27XX"].items() if isinstance(value, dict)}
+        if not instruments:
+            raise ValueError("No Keithley 27XX instrument in this configuration")
+        if name is None:
+            name = next(iter(instruments))
+        table = instruments[name]
+
+        modules = {key: value for key, value in table.items() if isinstance(value, dict)}
+        sensors_settings = sensors_settings_from_channels(modules)
+        instrument = cls(name, table.get("title"), table.get("rsrc_name_example"), table.get("rsrc_name"),
+                         table.get("model_name"), table.get("panel"), table.get("termination_character"),
+                         sensors_settings, parse_sensor_profiles(sensors_settings, interned))
+        for module_name, module_table in modules.items():
+            instrument.add_module(module_name, module_table.get("module_name"), module_table.get("info"))
+            instrument.modules[-1].load_channels(module_table.get("CHANNELS", {}))
+        return instrument
+
+    @classmethod
+    def from_toml(cls, path: str, name: str = None):
+
+        """Rebuild an instrument from a tolm file (the first instrument of the file if name is None)"""
+
+        with open(path, "r") as f:
+            return cls.from_dict(toml.load(f), name)
+
+    def header_dict(self):
+
+        """Get the instrument's own table (without its modules) as written in the tolm file"""
+
+        return {"title": str(self.title),
+                "rsrc_name_example": str(self.rsrc_name_example),
+                "rsrc_name": str(self.rsrc_name),
+                "model_name": str(self.model_name),
+                "panel": str(self.panel),
+                "termination_character": str(self.termination_character)}
+
+    def to_dict(self):
+
+        """Get the configuration as the nested dictionary written in the tolm file"""
+
+        instrument = self.header_dict()
+        for module in self.modules:
+            instrument[module.name] = module.to_dict()
+
+        return {"title": TOLM_TITLE,
+                "Keithley": {"27XX": {"title": KEITHLEY_27XX_TITLE,
+                                      self.name: instrument}}}
+
+    def iter_tolm_sections(self):
+
+        """Yield the tolm file section by section"""
+
+        return iter_tolm_sections([self])
+
+    def to_toml_string(self):
+
+        """Get the content of the tolm file without writing it on the disk"""
+
+        return "".join(self.iter_tolm_sections())
+
+    def dump_tolm(self, f):
+
+        """Stream the tolm file into an opened text file object"""
+
+        write_tolm_sections(self.iter_tolm_sections(), f)
+
+    def content_hash(self):
+
+        """Get the SHA-256 hex digest of the tolm file content"""
+
+        digest = hashlib.sha256()
+        for section in self.iter_tolm_sections():
+            digest.update(section.encode("utf-8"))
+        return digest.hexdigest()
+
+    def section_count(self):
+
+        """Get the number of sections iter_tolm_sections yields"""
+
+        return 3 + sum(1 + max(module.channel_count(), 1) for module in self.modules)
+
+    def render_state(self):
+
+        """Get a key which changes whenever the tolm file's content may change, without rendering it"""
+
+        return (str(self.name), tuple(self.header_dict().items()),
+                tuple((id(module), str(module.name), str(module.number), str(module.info), module._version)
+                      for module in self.modules))
+
+    def update_tolm(self, output_path, progress=None, cancelled=None):
+
+        """Write the tolm file only if its content changed, return True if it was written
+
+        The file is streamed next to its destination while it is hashed, then
+        swapped with it, or dropped when the file on the disk has the same content.
+        Nothing is rendered when neither the instrument nor the file on the disk
+        (size and modification time) changed since the last call. Otherwise only the
+        channels of the modules which changed are rendered : when the file on the disk
+        is the one of the last call, the channels sections of the other modules are
+        copied from it, one module at a time.
+
+        progress(done, total) is called after each written section, and
+        cancelled() before each one : when it returns True, GenerationCancelled
+        is raised and the file on the disk is left as it was."""
+
+        path = os.path.abspath(output_path)
+        state = self.render_state()
+        on_disk = file_stat(path)
+        written = self._written.get(path)  # (file stat, content hash, render state, spans) of the last call
+        if written is not None and on_disk is not None and written[0] == on_disk and written[2] == state:
+            return False
+        # (module, version, instrument name, module name) -> (position, length) of its channels sections in the
+        # file on the disk, only trusted when nobody changed the file since the last call
+        deployed_spans = written[3] if written is not None and on_disk is not None and written[0] == on_disk else {}
+        spans = {}
+
+        total = self.section_count()
+        digest = hashlib.sha256()
+        done = 0
+        temporary_path = path + ".tmp"
+        deployed = open(path, "r") if deployed_spans else None
+        try:
+            with open(temporary_path, "w") as f:
+
+                def emit(text: str, count: int):
+                    nonlocal done
+                    if cancelled is not None and cancelled():
+                        raise GenerationCancelled(output_path)
+                    digest.update(text.encode("utf-8"))
+                    f.write(text)
+                    done += count
+                    if progress is not None:
+                        progress(done, total)
+
+                for instrument, module, sections in iter_tolm_parts([self]):
+                    if module is None:
+                        for section in sections:
+                            emit(section, 1)
+                        continue
+                    key = (id(module), module._version, str(instrument.name), str(module.name))
+                    start = f.tell()
+                    if key in deployed_spans:  # Unchanged : copied without rendering its channels
+                        deployed.seek(deployed_spans[key][0])
+                        text = deployed.read(deployed_spans[key][1])
+                        emit(text, max(module.channel_count(), 1))
+                        spans[key] = (start, len(text))
+                    else:
+                        length = 0
+                        for section in sections:
+                            emit(section, 1)
+                            length += len(section)
+                        spans[key] = (start, length)
+            if deployed is not None:
+                deployed.close()
+            content_hash = digest.hexdigest()
+
+            if on_disk is not None:
+                # The hash of the file on the disk is only computed again if someone else changed it
+                disk_hash = written[1] if written is not None and written[0] == on_disk else file_content_hash(path)
+                if disk_hash == content_hash:
+                    os.remove(temporary_path)
+                    self._written[path] = (on_disk, content_hash, state, spans)
+                    return False
+                shutil.copymode(path, temporary_path)  # The deployed file keeps its permissions
+            os.replace(temporary_path, path)
+        except BaseException:
+            if deployed is not None:
+                deployed.close()
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        self._written[path] = (file_stat(path), content_hash, state, spans)
+        return True
+
     def write_tolm(self, output_path):
 
         """Generate a tolm file with the info input from the user"""
-        
-        self.tolm = f""""""  # Wiping self.tolm
-        self.tolm += f"""
-title = "this is the configuration file of the Keithley plugin"
-
-[Keithley.27XX]
-title = "Configuration entry for a Keithley 27XX Multimeter/Switch System"
-
-[Keithley.27XX.{self.name}]
-title = \"{self.title}\"
-rsrc_name_example = \"{self.rsrc_name_example}\"
-rsrc_name = \"{self.rsrc_name}\"
-model_name = \"{self.model_name}\"
-panel = \"{self.panel}\"
-termination_character = \"{self.termination_character}\"
-"""
 
-        for module in self.modules:
-            self.tolm += f"""
-[Keithley.27XX.{self.name}.{module.name}]
-module_name = \"{module.number}\"
-info = \"{module.info}\"
+        if self.update_tolm(output_path):
+            print("Your tolm file has been successfully generated")
+        else:
+            print("Your tolm file is already up to date")
 
-[Keithley.27XX.INSTRUMENT01.{module.name}.CHANNELS]
-"""
 
-        for module in self.modules:
-            for chan in module.channels:
-                match chan.transducer:
-                    case "tc":
-                        self.tolm += f"""
-[Keithley.27XX.{self.name}.{module.name}.CHANNELS.{chan.number}]
-mode = \"{chan.mode}\"
-transducer = \"{chan.transducer}\"
-type = \"{chan.type}\"
-ref_junc = \"{chan.ref_junc}\"
-resolution = \"{chan.resolution}\"
-nplc = \"{chan.nplc}\"
-"""
-                    case "frtd":
-                        self.tolm += f"""
-[Keithley.27XX.{self.name}.{module.name}.CHANNELS.{chan.number}]                        
-mode = \"{chan.mode}\"
-transducer = \"{chan.transducer}\"
-type = \"{chan.type}\"
-resolution = \"{chan.resolution}\"
-nplc = \"{chan.nplc}\"
-"""
-                    case _:
-                        self.tolm += f"""
-[Keithley.27XX.{self.name}.{module.name}.CHANNELS.{chan.number}]
-mode = \"{chan.mode}\"
-"""
-        self.tolm = toml.loads(self.tolm)
+class KeithleyProject:
+
+    """Project data object : several Keithley instruments described in one or several tolm files"""
+
+    def __init__(self):
+        self.instruments = []
+        self._profiles = {}  # SensorProfile.key() -> SensorProfile, shared by all the instruments
+
+    def add_instrument(self, name, title, rsrc_name_example, rsrc_name,
+                       model_name, panel, termination_character, sensors_settings=None):
+
+        """Add an instrument to the project, with interned sensors profiles"""
+
+        if any(instrument.name == name for instrument in self.instruments):
+            raise ValueError(f"The project already has an instrument named {name}")
+        if sensors_settings is None:
+            sensors_settings = DEFAULT_SENSORS_SETTINGS
+        profiles = parse_sensor_profiles(sensors_settings, self._profiles)
+        self.instruments.append(Keithley2700(name, title, rsrc_name_example, rsrc_name, model_name, panel,
+                                             termination_character, sensors_settings, profiles))
+        self.__setattr__(name, self.instruments[-1])  # Give the instrument as an attribute to the project
+        return self.instruments[-1]
+
+    @classmethod
+    def from_toml(cls, path: str):
+
+        """Rebuild a project with all the instruments of a tolm file"""
+
+        with open(path, "r") as f:
+            config = toml.load(f)
+        project = cls()
+        for name, table in config["Keithley"]["27XX"].items():
+            if isinstance(table, dict):
+                instrument = Keithley2700.from_dict(config, name, project._profiles)
+                project.instruments.append(instrument)
+                project.__setattr__(name, instrument)
+        return project
+
+    def iter_tolm_sections(self):
+
+        """Yield the combined tolm file of all the instruments section by section"""
+
+        return iter_tolm_sections(self.instruments)
+
+    def to_toml_string(self):
+
+        """Get the content of the combined tolm file without writing it on the disk"""
+
+        return "".join(self.iter_tolm_sections())
+
+    def write_tolm(self, output_path):
+
+        """Generate one tolm file describing all the instruments"""
+
         with open(output_path, "w") as f:
-            toml.dump(self.tolm, f)
+            write_tolm_sections(self.iter_tolm_sections(), f)
         print("Your tolm file has been successfully generated")
 
+    def write_tolm_per_instrument(self, output_dir):
+
+        """Generate one tolm file per instrument (named after it) in a folder, return the written paths"""
+
+        written = []
+        for instrument in self.instruments:
+            output_path = os.path.join(output_dir, f"{instrument.name}.toml")
+            if instrument.update_tolm(output_path):  # Unchanged files are not rewritten
+                written.append(output_path)
+        return written
+
+
+# Functions definitions
+
+
+def parse_sensor_profiles(sensors_settings: dict, interned: dict = None):
+
+    """Parse sensors settings ({"Frtd": {...}, "Tc": {...}, "Volt": {...}}) into {sensor: SensorProfile}
+
+    When an interning table is given, identical profiles are only created once and shared."""
+
+    profiles = {}
+    for sensor, settings_key in (("frtd", "Frtd"), ("tc", "Tc"), ("Volt", "Volt")):
+        if sensors_settings and settings_key in sensors_settings:
+            profile = SensorProfile.from_settings(sensor, sensors_settings[settings_key])
+            if interned is not None:
+                profile = interned.setdefault(profile.key(), profile)
+            profiles[sensor] = profile
+    return profiles
+
+
+
+def tolm_key(key):
+
+    """Render a key of a section header exactly as toml.dump does (quoted if needed)"""
+
+    key = str(key)
+    return key if _BARE_KEY.match(key) else _ENCODER.dump_value(key)
+
+
+def tolm_section(keys, values: dict):
+
+    """Render one [section] of the tolm file exactly as toml.dump does"""
+
+    return "\n[" + ".".join(tolm_key(key) for key in keys) + "]\n" + toml.dumps(values)
+
+
+def iter_tolm_sections(instruments: list):
+
+    """Yield the sections of a tolm file describing one or several instruments
+
+    Sections come out in the order toml.dump writes them (level by level), so
+    the joined sections are byte-identical to dumping Keithley2700.to_dict().
+    Nothing is kept once yielded, so the memory used does not grow with the file."""
+
+    for _, _, sections in iter_tolm_parts(instruments):
+        yield from sections
+
+
+def iter_tolm_parts(instruments: list):
+
+    """Yield the tolm file as (instrument, module, sections) parts, in the order of iter_tolm_sections
+
+    The channels sections of each module come as one part, rendered only when
+    they are iterated ; module is None for the other parts."""
+
+    yield None, None, (toml.dumps({"title": TOLM_TITLE}),)
+    yield None, None, (tolm_section(("Keithley", "27XX"), {"title": KEITHLEY_27XX_TITLE}),)
+
+    for instrument in instruments:
+        yield instrument, None, (tolm_section(("Keithley", "27XX", instrument.name), instrument.header_dict()),)
+
+    for instrument in instruments:
+        for module in instrument.modules:
+            yield instrument, None, (module.header_section(instrument.name),)
+
+    # Empty CHANNELS tables come one level before the channels tables
+    for instrument in instruments:
+        for module in instrument.modules:
+            if not module.channel_count():
+                yield instrument, module, module.iter_channel_sections(instrument.name)
+
+    for instrument in instruments:
+        for module in instrument.modules:
+            if module.channel_count():
+                yield instrument, module, module.iter_channel_sections(instrument.name)
+
+
+def write_tolm_sections(sections, f):
+
+    """Write tolm sections one by one into an opened text file object"""
+
+    for section in sections:
+        f.write(section)
+
+
+def sensors_settings_from_channels(modules: dict):
+
+    """Get sensors settings back from the channels tables of a tolm file, the defaults filling the gaps"""
+
+    sensors_settings = {key: dict(settings) for key, settings in DEFAULT_SENSORS_SETTINGS.items()}
+    found = set()
+    for module_table in modules.values():
+        for table in module_table.get("CHANNELS", {}).values():
+            transducer = table.get("transducer")
+            settings_key = {"frtd": "Frtd", "tc": "Tc"}.get(transducer, "Volt")
+            if settings_key not in found:
+                found.add(settings_key)
+                sensors_settings[settings_key].update({key: value for key, value in table.items()
+                                                       if value != "None"})
+            if len(found) == 3:
+                return sensors_settings
+    return sensors_settings
+
+
+def channel_bit(nb_channel):
+
+    """Get the bit of a channel in the channels bitsets (bit n for channel n)"""
+
+    return 1 << int(nb_channel)
+
+
+def channels_to_mask(channels):
+
+    """Get the bitset of a list of channel numbers"""
+
+    mask = 0
+    for nb_channel in channels:
+        mask |= 1 << int(nb_channel)
+    return mask
+
+
+def mask_to_channels(mask: int):
+
+    """Get the channel numbers (as strings, in ascending order) of a bitset"""
+
+    channels = []
+    while mask:
+        lowest = mask & -mask
+        channels.append(str(lowest.bit_length() - 1))
+        mask ^= lowest
+    return channels
+
+
+def parse_channel_spec(channels, slot: int = None):
+
+    """Get the channel numbers described by a range string, a list, a boolean mask or a bitset
+
+    Boolean masks and bitsets are relative to the card (index/bit 0 for channel 1),
+    so they need the card's slot. Range strings, lists and NumPy arrays which are
+    not boolean hold the channel numbers."""
+
+    if isinstance(channels, str):
+        numbers = []
+        for part in channels.replace(" ", "").split(","):
+            if "-" in part:
+                first, last = part.split("-")
+                numbers.extend(str(nb_channel) for nb_channel in range(int(first), int(last) + 1))
+            elif part:
+                numbers.append(str(int(part)))
+        return numbers
+
+    if isinstance(channels, Integral):  # int or NumPy integer bitset
+        card_mask = int(channels)
+    elif getattr(channels, "dtype", None) == bool:  # NumPy boolean mask, without importing NumPy here
+        card_mask = channels_to_mask(channels.nonzero()[0])
+    elif hasattr(channels, "dtype"):  # NumPy array of channel numbers
+        return [str(int(nb_channel)) for nb_channel in channels]
+    elif channels and all(isinstance(flag, bool) for flag in channels):  # Python boolean mask
+        card_mask = channels_to_mask(index for index, flag in enumerate(channels) if flag)
+    else:  # List of channel numbers
+        return [str(nb_channel) for nb_channel in channels]
+
+    if card_mask < 0 or card_mask >> CARD_CHANNELS:
+        raise ValueError(f"A card only has {CARD_CHANNELS} channels")
+    if slot is None:
+        raise ValueError("The card's slot is needed to configure channels from a mask")
+    return mask_to_channels(card_mask << (100 * slot + 1))
+
+
+def sensor_conflicts(masks: dict):
+
+    """Get the channels given to several sensors, as {(sensor1, sensor2): bitset}, from {sensor: bitset}"""
+
+    sensors = list(masks)
+    conflicts = {}
+    for i, sensor1 in enumerate(sensors):
+        for sensor2 in sensors[i + 1:]:
+            overlap = masks[sensor1] & masks[sensor2]
+            if overlap:
+                conflicts[(sensor1, sensor2)] = overlap
+    return conflicts
+
+
+def file_stat(path: str):
+
+    """Get (size, modification time) of a file, None if there is none"""
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_content_hash(path: str):
+
+    """Get the SHA-256 hex digest of a text file, as Keithley2700.content_hash computes it"""
+
+    digest = hashlib.sha256()
+    with open(path, "r") as f:
+        for line in f:
+            digest.update(line.encode("utf-8"))
+    return digest.hexdigest()
+
 
 if __name__ == "__main__":
     INSTRUMENT01 = Keithley2700(name="INSTRUMENT01",
@@ -0,0 +1,221 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Update a deployed tolm file with only the sections which changed
+
+diff_instruments compares two Keithley2700 section by section and apply_patch
+splices the changed sections into a deployed file : the untouched sections are
+copied as they are, never rendered again. The patched file is byte-identical to
+the file the new instrument would write, so update_tolm finds it up to date.
+"""
+
+# Imports
+import bisect
+import os
+import re
+import shutil
+import tempfile
+
+from keithleyDataClass import Keithley2700, tolm_key, tolm_section
+
+# A key of a section header : bare or double quoted
+_HEADER_KEY = re.compile(r'[A-Za-z0-9_-]+|"(?:[^"\\]|\\.)*"')
+
+
+# Classes definitions
+
+
+class SectionChange:
+
+    """One section to add, remove, change or move in a tolm file"""
+
+    __slots__ = ("op", "keys", "values", "after")
+
+    def __init__(self, op: str, keys: tuple, values: dict = None, after: tuple = None):
+        self.op = op  # "add", "remove", "change" or "move"
+        self.keys = keys  # Keys of the section, e.g ("Keithley", "27XX", "INSTRUMENT01", "MODULE01")
+        self.values = values  # New values of the section, None when it is removed
+        self.after = after  # Keys of the section written just before it in the new file, None if unknown
+
+    def __repr__(self):
+        return f"SectionChange({self.op!r}, {'.'.join(self.keys)})"
+
+
+# Functions definitions
+
+
+def section_tables(instrument: Keithley2700):
+
+    """Get {section keys: values} of every section describing an instrument, in the order of the tolm file"""
+
+    root = ("Keithley", "27XX", str(instrument.name))
+    tables = {root: instrument.header_dict()}
+    for module in instrument.modules:
+        tables[root + (str(module.name),)] = module.header_dict()
+    for module in instrument.modules:  # toml.dump only writes a CHANNELS table by itself when it has no channel
+        if not module.channel_count():
+            tables[root + (str(module.name), "CHANNELS")] = {}
+    for module in instrument.modules:
+        for number, table in module.channel_tables():
+            tables[root + (str(module.name), "CHANNELS", number)] = table
+    return tables
+
+
+def _kept_in_order(keys: list, rank: dict):
+
+    """Get the largest set of keys whose ranks already come in ascending order (the others have to move)"""
+
+    tails = []  # tails[n] : index of the smallest last key of an ascending run of n + 1 keys
+    tail_ranks = []  # Ranks of the tails' keys
+    previous = [None] * len(keys)
+    for index, key in enumerate(keys):
+        length = bisect.bisect_left(tail_ranks, rank[key])
+        previous[index] = tails[length - 1] if length else None
+        if length == len(tails):
+            tails.append(index)
+            tail_ranks.append(rank[key])
+        else:
+            tails[length] = index
+            tail_ranks[length] = rank[key]
+    kept = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        kept.add(keys[index])
+        index = previous[index]
+    return kept
+
+
+def diff_instruments(old: Keithley2700, new: Keithley2700):
+
+    """Get the minimal list of SectionChange turning the tolm file of old into the one of new"""
+
+    old_tables = section_tables(old)
+    new_tables = section_tables(new)
+    changes = [SectionChange("remove", keys) for keys in old_tables if keys not in new_tables]
+
+    # Sections of both files which are not in the same order anymore are moved
+    old_rank = {keys: rank for rank, keys in enumerate(old_tables)}
+    kept = _kept_in_order([keys for keys in new_tables if keys in old_tables], old_rank)
+
+    previous = None
+    for keys, values in new_tables.items():
+        if keys not in old_tables:
+            changes.append(SectionChange("add", keys, values, previous))
+        elif keys not in kept:
+            changes.append(SectionChange("move", keys, values, previous))
+        elif old_tables[keys] != values:
+            changes.append(SectionChange("change", keys, values, previous))
+        previous = keys
+    return changes
+
+
+def _split_sections(text: str):
+
+    """Split a tolm file into its sections, as iter_tolm_sections yields them"""
+
+    # Values never hold a raw line break (toml escapes it), so "\n[" always starts a section
+    starts = [0] + [match.start() for match in re.finditer(r"\n\[", text)]
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+def _section_keys(section: str):
+
+    """Get the rendered header keys of a section, () for the root one"""
+
+    if not section.startswith("\n["):
+        return ()
+    return tuple(_HEADER_KEY.findall(section[2:section.index("\n", 2) - 1]))
+
+
+def apply_patch(path: str, changes: list):
+
+    """Apply a list of SectionChange to a deployed tolm file, return the number of applied changes
+
+    Only the changed sections are rendered. A new (or moved) section is written
+    right after the section it follows in the new file, or, when it is the first
+    of its level, where toml.dump puts that level : sections come level by level
+    (e.g every empty CHANNELS table before the first channel table), instrument
+    by instrument. The file is replaced atomically, keeping its permissions, and
+    left untouched when there is nothing to change."""
+
+    if not changes:
+        return 0
+
+    with open(path, "r") as f:
+        sections = _split_sections(f.read())
+
+    # One pass over the headers, then every change is located in constant time
+    positions = {}  # Section keys -> index
+    instruments = {}  # Instrument key -> rank in the file
+    order = []  # (number of keys, instrument rank) of each section, ascending in a toml.dump file
+    for index, section in enumerate(sections):
+        section_keys = _section_keys(section)
+        positions[section_keys] = index
+        if len(section_keys) == 3:
+            instruments.setdefault(section_keys[2], len(instruments))
+        order.append((len(section_keys), instruments.get(section_keys[2], -1) if len(section_keys) > 2 else -1))
+
+    def level_anchor(rendered_keys: tuple, first: bool):
+        # Last section before the new one's level (first) or at its level (last), for its instrument
+        level = (len(rendered_keys), instruments.get(rendered_keys[2], len(instruments)))
+        return (bisect.bisect_left if first else bisect.bisect_right)(order, level) - 1
+
+    applied = 0
+    removed = set()
+    inserted = {}  # Index -> new sections to write after it
+    placed = {}  # Keys of the inserted sections -> index they are written after
+    for change in changes:
+        rendered_keys = tuple(tolm_key(key) for key in change.keys)
+        index = positions.get(rendered_keys)
+        if change.op == "remove":
+            if index is not None:
+                removed.add(index)
+                applied += 1
+            continue
+        if index is not None and change.op != "move":  # Changed (or added, but already in the deployed file)
+            sections[index] = tolm_section(change.keys, change.values)
+            applied += 1
+            continue
+
+        # Added, moved, or missing from the deployed file : after the section it follows
+        if index is not None:
+            removed.add(index)
+        after = tuple(tolm_key(key) for key in change.after) if change.after is not None else None
+        if after is not None and len(after) == len(rendered_keys) and (after in placed or after in positions):
+            anchor = placed[after] if after in placed else positions[after]
+        else:  # First of its level (or without a known predecessor)
+            anchor = level_anchor(rendered_keys, first=after is not None)
+        inserted.setdefault(anchor, []).append(tolm_section(change.keys, change.values))
+        placed[rendered_keys] = anchor
+        applied += 1
+
+    # Written next to the deployed file, then swapped with it
+    directory = os.path.dirname(os.path.abspath(path))
+    temporary = tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp")
+    try:
+        with temporary as f:
+            for index, section in enumerate(sections):
+                if index not in removed:
+                    f.write(section)
+                for new_section in inserted.get(index, ()):
+                    f.write(new_section)
+        shutil.copymode(path, temporary.name)  # Created readable by its owner only, the deployed file keeps its mode
+        os.replace(temporary.name, path)
+    except BaseException:
+        if os.path.exists(temporary.name):
+            os.remove(temporary.name)
+        raise
+    return applied
+
+
+def update_deployed(path: str, instrument: Keithley2700):
+
+    """Bring a deployed tolm file up to date with an instrument, return the number of changed sections
+
+    Only the changed sections are rendered and the others are copied as they are,
+    but the deployed file is still parsed as a whole (its Channel objects are
+    never created) to be compared with the instrument : the time taken grows with
+    the size of the file, not only with the number of changes."""
+
+    deployed = Keithley2700.from_toml(path, instrument.name)
+    return apply_patch(path, diff_instruments(deployed, instrument))
@@ -0,0 +1,157 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Save the GUI's cards and settings in a compact session file, and read them back
+
+A session file is a compact json object :
+
+    {"version": 1,
+     "keithley_settings": {...}, "sensors_settings": {...},   # Only when set by the user
+     "cards": [{"name": "MODULE01", "number": "7706", "info": "",
+                "channels": [101, 40],                        # [first, count], or the list of channels
+                "Frtd": "1", "Tc": "3e", "Volt": "0"}],       # Checked channels, hexadecimal bitsets
+     "templates": {"7702": {...}}}                            # Cards templates, see CardModel.template
+
+with bit n of a bitset for the n-th channel of the card.
+"""
+
+# Imports
+import json
+import os
+import threading
+
+from cardModel import CardModel, CARD_FIELDS, SENSOR_TYPES
+
+# Constants
+SESSION_VERSION = 1
+SESSION_PATH = os.path.join(os.path.expanduser("~"), ".tgpa", "session.json")  # Default session file
+
+_write_lock = threading.Lock()  # Sessions are written from a thread pool
+_last_written = {}  # Session file -> sequence number of the snapshot on the disk
+
+
+# Functions definitions
+
+
+def _pack_channels(channels: list):
+
+    """Get [first, count] for consecutive channel numbers, else the list of the channels"""
+
+    if channels and all(channel.isdigit() for channel in channels):
+        first = int(channels[0])
+        if [int(channel) for channel in channels] == list(range(first, first + len(channels))):
+            return [first, len(channels)]
+    return list(channels)
+
+
+def _unpack_channels(packed: list):
+
+    """Get back the channels packed by _pack_channels"""
+
+    if not isinstance(packed, list):
+        raise TypeError(f"The channels of a card are not a list : {packed!r}")
+    if len(packed) == 2 and all(isinstance(value, int) for value in packed):
+        return [str(channel) for channel in range(packed[0], packed[0] + packed[1])]
+    return [str(channel) for channel in packed]
+
+
+def card_to_session(card: CardModel):
+
+    """Get the session entry of a card"""
+
+    entry = {"name": card.name, "number": card.number, "info": card.info, "channels": _pack_channels(card.channels)}
+    for sensor in SENSOR_TYPES:
+        mask = 0
+        for channel in card.selections[sensor]:
+            mask |= 1 << card.positions[channel]
+        entry[sensor] = format(mask, "x")
+    return entry
+
+
+def card_from_session(entry: dict):
+
+    """Get the card described by a session entry, TypeError, KeyError or ValueError if it is malformed"""
+
+    if not isinstance(entry, dict) or not all(isinstance(entry[field], str) for field in CARD_FIELDS):
+        raise TypeError(f"Malformed card entry : {entry!r}")
+    card = CardModel(entry["name"], entry["number"], entry["info"], _unpack_channels(entry["channels"]))
+    assignment = {}
+    for sensor in SENSOR_TYPES:
+        mask = int(entry.get(sensor, "0"), 16)
+        if mask < 0 or mask >> len(card.channels):
+            raise ValueError(f"The {sensor} channels of {card.name} are not channels of the card")
+        while mask:
+            lowest = mask & -mask
+            assignment[card.channels[lowest.bit_length() - 1]] = sensor
+            mask ^= lowest
+    card.assign_many(assignment)
+    return card
+
+
+def session_contents(session: dict):
+
+    """Get (cards, keithley settings, sensors settings, templates) of a session, the settings being None
+    when not set, TypeError, KeyError or ValueError if the session is malformed"""
+
+    cards = [card_from_session(entry) for entry in session["cards"]]
+    settings = [session.get(key) for key in ("keithley_settings", "sensors_settings")]
+    if not all(value is None or isinstance(value, dict) for value in settings):
+        raise TypeError("The settings of the session are not tables")
+    templates = session.get("templates", {})
+    if not isinstance(templates, dict) or not all(
+            isinstance(template, dict) and isinstance(template.get("number", ""), str)
+            and all(isinstance(position, int) for sensor in SENSOR_TYPES for position in template.get(sensor, ()))
+            for template in templates.values()):
+        raise TypeError("Malformed templates in the session")
+    return cards, settings[0], settings[1], templates
+
+
+def session_snapshot(cards: list, keithley_settings: dict = None, sensors_settings: dict = None,
+                     templates: dict = None):
+
+    """Get the session describing the GUI's cards and settings, sharing nothing with them"""
+
+    session = {"version": SESSION_VERSION}
+    if keithley_settings is not None:
+        session["keithley_settings"] = json.loads(json.dumps(keithley_settings))
+    if sensors_settings is not None:
+        session["sensors_settings"] = json.loads(json.dumps(sensors_settings))
+    session["cards"] = [card_to_session(card) for card in cards]
+    if templates:
+        session["templates"] = json.loads(json.dumps(templates))
+    return session
+
+
+def write_session(path: str, session: dict, sequence: int = None):
+
+    """Write a session file atomically, return True if it was written
+
+    With a sequence number, a snapshot older than the one already written
+    (several writes running in a thread pool) is dropped."""
+
+    with _write_lock:
+        if sequence is not None and sequence <= _last_written.get(path, -1):
+            return False
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(session, f, separators=(",", ":"))
+        os.replace(temporary_path, path)
+        if sequence is not None:
+            _last_written[path] = sequence
+    return True
+
+
+def read_session(path: str):
+
+    """Read a session file, None if there is none or if it cannot be used"""
+
+    try:
+        with open(path, "r") as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(session, dict) or session.get("version") != SESSION_VERSION:
+        return None
+    return session
@@ -8,14 +8,20 @@ Purpose : Automatically generate tolm files for keithley in pymodaq
 # Libraries for the frontend (PyQt5, sys)
 from PyQt5.QtWidgets import QCheckBox, QVBoxLayout, QWidget, QApplication, QPushButton, \
  QLabel, QGridLayout, QTabWidget, QFrame, QSpacerItem, QSizePolicy, QToolButton, QMainWindow, \
- QAction, QMenu, QDialog, QFormLayout, QLineEdit, QDialogButtonBox, QFileDialog
-from PyQt5.QtGui import QPixmap
-from pyqt_checkbox_list_widget.checkBoxListWidget import CheckBoxListWidget
-from PyQt5.QtCore import Qt
+ QAction, QMenu, QDialog, QFormLayout, QLineEdit, QDialogButtonBox, QFileDialog, QTableView, QHeaderView, QProgressBar, \
+ QUndoStack, QUndoCommand
+from PyQt5.QtGui import QPixmap, QColor, QKeySequence
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+import os
 import sys
+import threading
+import toml
 
 # Libraries for the backend
-from keithleyDataClass import Keithley2700
+from keithleyDataClass import Keithley2700, GenerationCancelled, DEFAULT_KEITHLEY_SETTINGS, DEFAULT_SENSORS_SETTINGS
+from cardModel import CardModel, SENSOR_TYPES
+from cardValidator import AssignmentValidator
+from sessionStore import SESSION_PATH, read_session, session_contents, session_snapshot, write_session
 from utilities import getAFilesPath, getAFilesPathToSave  # Some usefull small functions for a better user experience
 
 
@@ -181,13 +187,224 @@ class SensorsDialog(QDialog):
         return self.sensors
 
 
+class ChannelSensorModel(QAbstractTableModel):
+    """Qt model of a card : one row per channel, one checkable column per sensor, one sensor per channel"""
+
+    headers = ("FRTD", "Tc", "Volt")  # Columns titles, in the SENSOR_TYPES order
+    issue_color = QColor(255, 200, 200)  # Background of the checked channels with an issue
+
+    def __init__(self, card: CardModel, validator: AssignmentValidator, parent=None):
+        super().__init__(parent)
+        self.card = card  # The checks are read from the card and changed through its API
+        self.validator = validator  # Issues of the channels, up to date when card_changed is called
+        self.card.listeners.append(self.card_changed)  # Whoever changes the card, the view follows
+
+    def detach(self):
+        """Stop following the card's changes"""
+
+        if self.card_changed in self.card.listeners:
+            self.card.listeners.remove(self.card_changed)
+
+    def card_changed(self, card, kind, changes):
+        """Repaint the rows of the channels which changed"""
+
+        if kind != "channels":
+            return
+        last_column = len(SENSOR_TYPES) - 1
+        if len(changes) == 1:
+            row = card.positions[changes[0][0]]
+            self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+        else:
+            rows = [card.positions[channel] for channel, old, new in changes]
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), last_column))
+
+    def refresh(self):
+        """Repaint the whole table"""
+
+        self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, len(SENSOR_TYPES) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.card.channels)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(SENSOR_TYPES)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return self.card.channels[section]
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.DisplayRole):
+        channel = self.card.channels[index.row()]
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self.card.sensor_of(channel) == SENSOR_TYPES[index.column()] else Qt.Unchecked
+        if role in (Qt.BackgroundRole, Qt.ToolTipRole) and self.card.sensor_of(channel) == SENSOR_TYPES[index.column()]:
+            issue = self.validator.channel_issue(self.card, channel)
+            if issue is not None:
+                return self.issue_color if role == Qt.BackgroundRole else issue
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Check or uncheck a channel for a sensor, unchecking it for the other sensors"""
+
+        if role != Qt.CheckStateRole:
+            return False
+        channel = self.card.channels[index.row()]
+        sensor = SENSOR_TYPES[index.column()]
+        if value == Qt.Checked:
+            self.card.assign(channel, sensor)
+        elif self.card.sensor_of(channel) == sensor:
+            self.card.assign(channel, None)
+        return True  # The view is repainted by card_changed
+
+    def set_column(self, sensor: str, checked: bool):
+        """Check or uncheck every channel of the card for a sensor"""
+
+        self.card.set_column(sensor, checked)
+
+    def is_column_checked(self, sensor: str):
+        """Check if every channel of the card is checked for a sensor"""
+
+        return len(self.card.selections[sensor]) == len(self.card.channels) > 0
+
+
+class CardTab(QWidget):
+    """Tab of a card : its widgets are only created the first time it is shown"""
+
+    def __init__(self, card: CardModel):
+        super().__init__()
+        self.card = card  # What the tab describes, readable without the widgets
+        self.built = False
+
+
+class GenerationSignals(QObject):
+    """Signals of a GenerationWorker : emitted from the pool's thread, received in the GUI's one"""
+
+    progress = pyqtSignal(int, int)  # Sections written, sections of the file
+    finished = pyqtSignal(str, bool)  # Path of the file, False if it was already up to date
+    cancelled = pyqtSignal(str)  # Path of the file, left untouched
+    failed = pyqtSignal(str, str)  # Path of the file, error message
+
+
+class GenerationWorker(QRunnable):
+    """Build the instrument and write its tolm file out of the Qt event loop"""
+
+    def __init__(self, keithley_settings: dict, sensors_settings: dict, data_settings: dict, output_path: str):
+        super().__init__()
+        self.signals = GenerationSignals()
+        self.keithley_settings = keithley_settings
+        self.sensors_settings = sensors_settings
+        self.data_settings = data_settings  # Cards entries are replaced, never changed, when the cards change
+        self.output_path = output_path
+        self.instrument = None  # Keithley2700 built by run
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Ask the generation to stop, the file on the disk is then left as it was"""
+        self._cancel.set()
+
+    def run(self):
+        try:
+            self.instrument = build_instrument(self.keithley_settings, self.sensors_settings, self.data_settings)
+            written = self.instrument.update_tolm(self.output_path, progress=self.signals.progress.emit,
+                                                  cancelled=self._cancel.is_set)
+        except GenerationCancelled:
+            self.signals.cancelled.emit(self.output_path)
+        except Exception as error:  # Shown to the user, a worker must not die silently
+            self.signals.failed.emit(self.output_path, f"{type(error).__name__}: {error}")
+        else:
+            self.signals.finished.emit(self.output_path, written)
+
+
+class SessionWriter(QRunnable):
+    """Write a session snapshot out of the Qt event loop"""
+
+    def __init__(self, path: str, session: dict, sequence: int):
+        super().__init__()
+        self.path = path
+        self.session = session  # Built for this writer only, shares nothing with the GUI
+        self.sequence = sequence
+
+    def run(self):
+        try:
+            write_session(self.path, self.session, self.sequence)
+        except OSError as error:  # The next change will try again
+            print("The session could not be saved : " + str(error))
+
+
+class CardEdit(QUndoCommand):
+    """One change of a card, as CardModel notifies it : (key, old value, new value) changes,
+    undone by applying them backwards, so it costs the size of the change"""
+
+    def __init__(self, window, card: CardModel, kind: str, changes: list):
+        super().__init__()
+        self.window = window
+        self.card = card
+        self.kind = kind  # "channels" or "settings"
+        self.changes = changes
+        self.pushed = False  # The change is already applied when the command is pushed
+        name = next((old for key, old, new in changes if key == "name"), card.name)  # Name before the change
+        if kind == "channels":
+            self.setText(f"{name} : {len(changes)} channel(s)")
+        else:
+            self.setText(f"{name} : {', '.join(field for field, old, new in changes)}")
+
+    def id(self):
+        return 1 if self.kind == "settings" else -1  # Only the typing in a field is merged
+
+    def mergeWith(self, other):
+        """Merge the keystrokes in a same field of a same card into one edit"""
+
+        if other.card is not self.card or len(self.changes) != 1 or len(other.changes) != 1 \
+                or other.changes[0][0] != self.changes[0][0]:
+            return False
+        field, old, _ = self.changes[0]
+        self.changes = [(field, old, other.changes[0][2])]
+        return True
+
+    def apply(self, value_index: int):
+        """Set the old (1) or new (2) values of the changes back in the card"""
+
+        if self.card not in self.window.cards:  # Its tab was closed
+            self.setObsolete(True)
+            return
+        self.window.replaying = True
+        try:
+            if self.kind == "channels":
+                self.card.assign_many({change[0]: change[value_index] for change in self.changes})
+            else:
+                for change in self.changes:
+                    self.card.set_field(change[0], change[value_index])
+        finally:
+            self.window.replaying = False
+
+    def undo(self):
+        self.apply(1)
+
+    def redo(self):
+        if not self.pushed:
+            self.pushed = True
+            return
+        self.apply(2)
+
+
 class MainWindow(QMainWindow):
 
     """Main app - GUI layout """
 
-    def __init__(self, keithleyChannelList):
+    _logo = None  # QPixmap of the logo, loaded once and shared by all the tabs
+    default_numbers = {1: "7706", 2: "7702"}  # Card number prefilled for the first tabs (my application)
+    session_delay = 500  # ms without change before the session is saved
+
+    def __init__(self, keithleyChannelList, session_path: str = None):
         super().__init__()
         self.keithleyChannelList = keithleyChannelList
+        self.session_path = session_path  # Session saved on change and restored at startup, None for none
         self.init_ui()
 
     def init_ui(self):
@@ -197,10 +414,25 @@ class MainWindow(QMainWindow):
         self.main_widget = QWidget()
         self.setCentralWidget(self.main_widget)
 
-        # Create a tab widget
+        # Cards models, in the tabs order : kept up to date by the widgets' signals
+        self.cards = []
+        self.undo_stack = QUndoStack(self)  # Every change of the cards, as compact CardEdit
+        self.replaying = False  # True while a CardEdit is undone or redone
+        self.templates = {}  # Card number -> template (see CardModel.template)
+        self.validator = AssignmentValidator()  # Checks every change of the cards
+        self.validator.listeners.append(self.card_issues_changed)
+
+        # Font of the checkboxes titles, shared by all the tabs
+        self.checkboxesFont = self.font()
+        self.checkboxesFont.setBold(True)
+        self.checkboxesFont.setItalic(True)
+        self.checkboxesFont.setPointSize(9)
+
+        # Create a tab widget, tabs widgets being created when shown
         self.tabs = QTabWidget()
         self.tabs.setTabsClosable(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
+        self.tabs.currentChanged.connect(self.build_tab)
 
         # Add a "+" button to add tabs
         self.add_tab_button = QToolButton(self)
@@ -210,10 +442,18 @@ class MainWindow(QMainWindow):
         # Set the button's location in the tabs
         self.tabs.setCornerWidget(self.add_tab_button, Qt.TopRightCorner)
 
-        # Add the first tab corresponding to the first card of the Keithley
-        self.tab1 = QWidget()
-        self.setup_tab(self.tab1, self.keithleyChannelList)
-        self.tabs.addTab(self.tab1, "Card n°1")
+        # Session saved a moment after the last change, written in a worker thread
+        self.session_sequence = 0
+        self.session_timer = QTimer(self)
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(self.session_delay)
+        self.session_timer.timeout.connect(self.save_session)
+
+        # Add the cards of the last session, or the first tab corresponding to the first card of the Keithley
+        session = read_session(self.session_path) if self.session_path else None
+        if session is None or not self.restore_session(session):
+            self.add_card_tab(self.new_card(self.keithleyChannelList))
+        self.tab1 = self.tabs.widget(0)
 
         # Add a button to save the lists
         self.button = QPushButton("Save the lists")
@@ -230,100 +470,255 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.button_generate)
         self.main_widget.setLayout(layout)
 
+        # Progress of the tolm file generation, in the status bar while it runs
+        self.worker = None
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setMaximumWidth(200)
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.clicked.connect(self.cancel_generation)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_button)
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+
         # Add a menu
         self.create_menu()
 
-    def setup_tab(self, tab, keithleyChannelList):
-        """Config a tab to set Keithley's channel to the rights sensors"""
+    @classmethod
+    def logo(cls):
+        """Get the logo's QPixmap, read from the disk only once"""
 
-        # Design checkboxes
-        checkboxesFont = self.font()
-        checkboxesFont.setBold(True)
-        checkboxesFont.setItalic(True)
-        checkboxesFont.setPointSize(9)
+        if cls._logo is None:
+            cls._logo = QPixmap(os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.png"))
+        return cls._logo
+
+    def new_card(self, keithleyChannelList):
+        """Get the model of a new card, prefilled for the next tab"""
 
-        # Design layout
-        layout = QGridLayout()
-        
         # Card information - prefilled information for my application, editable
         card_nb = str(self.tabs.count() + 1)
         if self.tabs.count() + 1 < 10:
             card_nb = ''.join(('0', card_nb))
+        card = CardModel(name="MODULE" + card_nb, channels=keithleyChannelList)
+        shown = self.current_card()  # The later tabs take the shown card's number
+        card.number = self.default_numbers.get(self.tabs.count() + 1, shown.number if shown is not None else "")
+        if card.number and card.number in self.templates:  # Cards of a number with a template start from it
+            card.apply_template(self.templates[card.number])
+        return card
+
+    def next_channels(self):
+        """Get the channel numbers of the next tab's card (slot n : n01 to n40)"""
+
+        slot = self.tabs.count() + 1
+        return [str(slot*100 + e) for e in range(1, 41)]
+
+    def current_card(self):
+        """Get the card of the shown tab, None without tab"""
+
+        index = self.tabs.currentIndex()
+        return self.cards[index] if index >= 0 else None
+
+    def clone_card(self):
+        """Add a tab with a copy of the shown card, its channels rebased on the new tab's slot"""
+
+        card = self.current_card()
+        if card is None:
+            return
+        card_nb = f"{self.tabs.count() + 1:02d}"
+        self.add_card_tab(card.clone("MODULE" + card_nb, self.next_channels()))
+
+    def save_template(self):
+        """Save the shown card's sensor map as the template of its card number"""
+
+        card = self.current_card()
+        if card is None:
+            return
+        if not card.number:  # It would be applied to every card without a number
+            self.statusBar().showMessage("Give the card a number to save its template")
+            return
+        self.templates[card.number] = card.template()
+        self.schedule_session_save()
+        self.statusBar().showMessage("Template saved for the " + card.number + " cards")
+
+    def apply_template(self, number: str = None):
+        """Apply the template of a card number (the shown card's one by default) to every card of that
+        number, in one step of the history"""
+
+        if number is None:
+            card = self.current_card()
+            number = card.number if card is not None else None
+        template = self.templates.get(number) if number else None
+        if template is None:
+            self.statusBar().showMessage("No template for the " + str(number) + " cards")
+            return
+        cards = [card for card in self.cards if card.number == number]
+        self.undo_stack.beginMacro(f"Apply the {number} template to {len(cards)} card(s)")
+        try:
+            for card in cards:
+                card.apply_template(template)
+        finally:
+            self.undo_stack.endMacro()
+        self.statusBar().showMessage(f"Template applied to {len(cards)} card(s)")
+
+    def add_card_tab(self, card: CardModel):
+        """Add a tab for a card, without creating its widgets"""
+
+        tab = CardTab(card)
+        self.cards.append(card)
+        self.validator.add_card(card)
+        card.listeners.append(self.card_edited)
+        self.schedule_session_save()
+        self.tabs.addTab(tab, f"Card n°{self.tabs.count() + 1}")  # Built right away only if it is shown
+        if self.validator.has_issues(card):  # A new tab is shown as having none
+            self.card_issues_changed(card)
+        return tab
+
+    def build_tab(self, index):
+        """Create the widgets of a tab the first time it is shown"""
+
+        tab = self.tabs.widget(index)
+        if isinstance(tab, CardTab) and not tab.built:
+            self.setup_tab(tab)
+
+    def setup_tab(self, tab: CardTab):
+        """Config a tab to set Keithley's channel to the rights sensors"""
+
+        card = tab.card
+
+        # Design layout
+        layout = QGridLayout()
+
+        # Card information
         tab.card_name_label = QLabel("Card name (e.g : MODULE01)")
         tab.card_name = QLineEdit(self)
+        tab.card_name.setText(card.name)
         tab.number_label = QLabel("Card number (e.g : 7706)")
         tab.number = QLineEdit(self)
-        if self.tabs.count() + 1 == 1:
-            tab.number.setText("7706")
-        if self.tabs.count() + 1 == 2:
-            tab.number.setText("7702")
-        tab.card_name.setText("MODULE" + card_nb)
-        if card_nb == '1':
-            tab.number.setText("7706")
-        elif card_nb == '2':
-            tab.number.setText("7702")
+        tab.number.setText(card.number)
         tab.info_label = QLabel("Info")
         tab.info = QLineEdit(self)
-        if self.tabs.count() + 1 >= 5:
+        tab.info.setText(card.info)
+        tab.card_name.textChanged.connect(lambda text: card.set_field("name", text))
+        tab.number.textChanged.connect(lambda text: card.set_field("number", text))
+        tab.info.textChanged.connect(lambda text: card.set_field("info", text))
+        with_logo = self.tabs.indexOf(tab) + 1 >= 5
+        if with_logo:
             tab.lab_pic = QLabel(self)
-            tab.logo = QPixmap("logo.png")
-            tab.lab_pic.setPixmap(tab.logo)
-            tab.lab_pic.resize(tab.logo.width(), tab.logo.height())
+            tab.lab_pic.setPixmap(self.logo())
+            tab.lab_pic.resize(self.logo().width(), self.logo().height())
 
         # Add widget to the layout
         layout.addWidget(tab.number_label, 0, 0)
         layout.addWidget(tab.number, 0, 1)
-        if self.tabs.count() + 1 >= 5:
+        if with_logo:
             layout.addWidget(tab.lab_pic, 0, 2, 2, 1, alignment=Qt.AlignCenter)
         layout.addWidget(tab.card_name_label, 1, 0)
         layout.addWidget(tab.card_name, 1, 1)
         layout.addWidget(tab.info_label, 2, 0)
         layout.addWidget(tab.info, 2, 1)
 
-        # FRTD checkbox design
-        title_Frtd = QLabel("FRTD")
-        title_Frtd.setAlignment(Qt.AlignCenter)
-        title_Frtd.setFont(checkboxesFont)
-        allCheckBoxFrtd = QCheckBox('Check all')
-        checkBoxListWidget_Frtd = CheckBoxListWidget()
-        checkBoxListWidget_Frtd.addItems(keithleyChannelList)
-        allCheckBoxFrtd.stateChanged.connect(checkBoxListWidget_Frtd.toggleState)
-
-        # Add widgets to the layout
-        layout.addWidget(title_Frtd, 3, 0)
-        layout.addWidget(allCheckBoxFrtd, 4, 0)
-        layout.addWidget(checkBoxListWidget_Frtd, 5, 0)
-
-        # TC checkbox design
-        title_Tc = QLabel("Tc")
-        title_Tc.setAlignment(Qt.AlignCenter)
-        title_Tc.setFont(checkboxesFont)
-        allCheckBoxTc = QCheckBox('Check all')
-        checkBoxListWidget_Tc = CheckBoxListWidget()
-        checkBoxListWidget_Tc.addItems(keithleyChannelList)
-        allCheckBoxTc.stateChanged.connect(checkBoxListWidget_Tc.toggleState)
-
-        # Add widgets to the layout
-        layout.addWidget(title_Tc, 3, 1)
-        layout.addWidget(allCheckBoxTc, 4, 1)
-        layout.addWidget(checkBoxListWidget_Tc, 5, 1)
-
-        # Voltage checkbox design
-        title_Volt = QLabel("Volt")
-        title_Volt.setAlignment(Qt.AlignCenter)
-        title_Volt.setFont(checkboxesFont)
-        allCheckBoxVolt = QCheckBox('Check all')
-        checkBoxListWidget_Volt = CheckBoxListWidget()
-        checkBoxListWidget_Volt.addItems(keithleyChannelList)
-        allCheckBoxVolt.stateChanged.connect(checkBoxListWidget_Volt.toggleState)
-
-        # Add widgets to the layout
-        layout.addWidget(title_Volt, 3, 2)
-        layout.addWidget(allCheckBoxVolt, 4, 2)
-        layout.addWidget(checkBoxListWidget_Volt, 5, 2)
+        # One table for the card : channels in rows, sensors in columns, only the visible rows are painted
+        tab.table_model = ChannelSensorModel(card, self.validator, tab)
+        tab.table = QTableView(tab)
+        tab.table.setModel(tab.table_model)
+        tab.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        tab.table.horizontalHeader().setFont(self.checkboxesFont)
+        tab.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # No per row size computation
+
+        # "Check all" boxes, kept in line with the table
+        tab.allCheckBoxes = {}
+        for column, sensor in enumerate(SENSOR_TYPES):
+            allCheckBox = QCheckBox('Check all')
+            allCheckBox.setChecked(tab.table_model.is_column_checked(sensor))
+            allCheckBox.clicked.connect(lambda checked, sensor=sensor: tab.table_model.set_column(sensor, checked))
+            layout.addWidget(allCheckBox, 3, column)
+            tab.allCheckBoxes[sensor] = allCheckBox
+        tab.table_model.dataChanged.connect(lambda *args: self.refresh_check_all(tab))
+        layout.addWidget(tab.table, 4, 0, 1, len(SENSOR_TYPES))
 
         # Set the tabs layout
         tab.setLayout(layout)
+        tab.built = True
+
+    def card_edited(self, card: CardModel, kind: str, changes: list):
+        """Record a card's change in the history, show it in the tab's fields and save the session"""
+
+        if not self.replaying:
+            self.undo_stack.push(CardEdit(self, card, kind, changes))
+        if kind == "settings":  # Undone, redone or pasted : the fields follow the card
+            tab = self.tabs.widget(self.cards.index(card))
+            if tab.built:
+                for field, old, new in changes:
+                    line_edit = {"name": tab.card_name, "number": tab.number, "info": tab.info}[field]
+                    if line_edit.text() != new:
+                        line_edit.setText(new)
+        self.schedule_session_save()
+
+    def schedule_session_save(self):
+        """(Re)start the session timer : changes in a row are saved only once"""
+        if self.session_path:
+            self.session_timer.start()
+
+    def save_session(self, wait: bool = False):
+        """Snapshot the cards and the settings, written in a worker thread (or right away if wait)"""
+
+        if not self.session_path:
+            return
+        self.session_timer.stop()
+        session = session_snapshot(self.cards, getattr(self, "keithley_settings", None),
+                                   getattr(self, "sensors_settings", None), self.templates)
+        self.session_sequence += 1
+        if wait:
+            write_session(self.session_path, session, self.session_sequence)
+        else:
+            QThreadPool.globalInstance().start(SessionWriter(self.session_path, session, self.session_sequence))
+
+    def restore_session(self, session: dict):
+        """Get the cards and the settings of a session back, only the shown tab being built
+
+        Return False, changing nothing, if the session has no card or cannot be used."""
+
+        try:
+            cards, keithley_settings, sensors_settings, templates = session_contents(session)
+        except (KeyError, IndexError, ValueError, TypeError) as error:  # Must not stop the GUI from starting
+            self.statusBar().showMessage(f"The last session could not be restored ({type(error).__name__}: "
+                                         f"{error}), a new one is started")
+            return False
+        if not cards:
+            return False
+        if keithley_settings is not None:
+            self.keithley_settings = keithley_settings
+        if sensors_settings is not None:
+            self.sensors_settings = sensors_settings
+        self.templates = templates
+        for card in cards:
+            self.add_card_tab(card)
+        return True
+
+    def closeEvent(self, event):
+        """Save the last changes before the window closes"""
+        if self.session_timer.isActive():
+            self.save_session(wait=True)
+        super().closeEvent(event)
+
+    def card_issues_changed(self, card: CardModel):
+        """Highlight a card's tab when it has issues, and list them in its tooltip"""
+
+        index = self.cards.index(card)
+        issues = self.validator.issues(card)
+        self.tabs.tabBar().setTabTextColor(index, QColor(Qt.red) if issues else self.palette().windowText().color())
+        self.tabs.setTabToolTip(index, "\n".join(issues))
+        tab = self.tabs.widget(index)
+        if tab.built:
+            tab.table_model.refresh()
+        if issues:
+            self.statusBar().showMessage(card.name + " : " + issues[0])
+
+    def refresh_check_all(self, tab: CardTab):
+        """Keep the "Check all" boxes of a tab in line with its table"""
+
+        for sensor, allCheckBox in tab.allCheckBoxes.items():
+            allCheckBox.setChecked(tab.table_model.is_column_checked(sensor))
 
     def create_menu(self):
         """Create a menu bar with a tab 'Keithley'"""
@@ -334,6 +729,10 @@ class MainWindow(QMainWindow):
          """) 
         keithley_menu = menubar.addMenu('&Keithley')
 
+        # Action to open an existing tolm file
+        open_action = QAction('Open', self)
+        open_action.triggered.connect(self.open_toml)
+
         # Action to open the configuration window
         keithley_settings_action = QAction('Keithley Settings', self)
         keithley_settings_action.triggered.connect(self.open_keithley_dialog)
@@ -348,15 +747,38 @@ class MainWindow(QMainWindow):
             }
         """)
     
+        keithley_menu.addAction(open_action)
         keithley_menu.addAction(keithley_settings_action)
         keithley_menu.addAction(sensors_settings_action)
 
+        # Tab "Edit" : undo / redo the changes of the cards
+        edit_menu = menubar.addMenu('&Edit')
+        undo_action = self.undo_stack.createUndoAction(self, 'Undo')
+        undo_action.setShortcut(QKeySequence.Undo)
+        redo_action = self.undo_stack.createRedoAction(self, 'Redo')
+        redo_action.setShortcut(QKeySequence.Redo)
+        edit_menu.addAction(undo_action)
+        edit_menu.addAction(redo_action)
+
+        # Tab "Cards" : clone the shown card, save and apply templates
+        cards_menu = menubar.addMenu('&Cards')
+        clone_action = QAction('Clone card', self)
+        clone_action.triggered.connect(self.clone_card)
+        save_template_action = QAction('Save as template for this card number', self)
+        save_template_action.triggered.connect(self.save_template)
+        apply_template_action = QAction('Apply template to all cards of this number', self)
+        apply_template_action.triggered.connect(lambda: self.apply_template())
+        cards_menu.addAction(clone_action)
+        cards_menu.addAction(save_template_action)
+        cards_menu.addAction(apply_template_action)
+
     def open_keithley_dialog(self):
         """Open window dialog to enter the parameters"""
         keithley_dialog = KeithleyDialog(self)
         if keithley_dialog.exec_() == QDialog.Accepted:
             # Récupérer les données de la boîte de dialogue
             self.keithley_settings = keithley_dialog.get_data()
+            self.schedule_session_save()
             
     def open_sensors_dialog(self):
         """Open window dialog to enter the parameters"""
@@ -364,136 +786,167 @@ class MainWindow(QMainWindow):
         if sensors_dialog.exec_() == QDialog.Accepted:
             # Récupérer les données de la boîte de dialogue
             self.sensors_settings = sensors_dialog.get_data()
+            self.schedule_session_save()
 
-    def add_new_tab(self):
-        """Add a new tab"""
-        # Count the number of tabs
-        tab_count = self.tabs.count() + 1
+    def open_toml(self):
+        """Load an existing tolm file : settings and one tab per card"""
 
-        # Create a new tab widget
-        new_tab = QWidget()
+        path = getAFilesPath("Open a tolm file", [('Tolm files', '*.tolm*'), ('Toml files', '*.toml'),
+                                                  ('All files', '*.*')])
+        if not path:
+            return
+        try:
+            instrument = Keithley2700.from_toml(path)
+        except (OSError, ValueError, KeyError, toml.TomlDecodeError) as error:  # An exception would kill the app
+            self.statusBar().showMessage(f"{path} could not be opened : {type(error).__name__}: {error}")
+            return
+
+        # Settings of the file replace the current ones
+        self.keithley_settings = {'title': instrument.title,
+                                  'rsrc_name_example': instrument.rsrc_name_example,
+                                  'rsrc_name': instrument.rsrc_name,
+                                  'model_name': instrument.model_name,
+                                  'panel': instrument.panel,
+                                  'termination_character': instrument.termination_character}
+        self.sensors_settings = instrument.sensors_settings
+
+        # One tab per card, its channels checked (neither the Channel objects nor the widgets are built)
+        while self.tabs.count():
+            self.close_tab(0)
+        for module in instrument.modules:
+            sensor_channels = module.sensor_channels()
+            slot = module.slot if module.slot is not None else self.tabs.count() + 1
+            channels = [str(slot*100 + e) for e in range(1, 41)]
+            offered = set(channels)
+            # Channels out of the card's slot (e.g 109 on a slot 2 card) are offered after its own ones
+            channels += [channel for numbers in sensor_channels.values() for channel in numbers
+                         if channel not in offered]
+            card = CardModel(module.name, module.number, module.info, channels)
+            card.assign_many({channel: {"frtd": "Frtd", "tc": "Tc", "Volt": "Volt"}[sensor]
+                              for sensor, numbers in sensor_channels.items() for channel in numbers})
+            self.add_card_tab(card)
 
-        # Add the label
-        cardChannelList = [str(tab_count*100 + e) for e in range(1,41)]
-        self.setup_tab(new_tab, cardChannelList)
-        self.tabs.addTab(new_tab, f"Card n°{tab_count}")
+    def add_new_tab(self):
+        """Add a new tab"""
+        # Add the tab, its widgets being created when it is shown
+        self.add_card_tab(self.new_card(self.next_channels()))
 
     def close_tab(self, index):
         """Deleter the tab"""
+        tab = self.tabs.widget(index)
+        if tab.built:
+            tab.table_model.detach()
+        self.validator.remove_card(self.cards[index])
+        self.cards[index].listeners.remove(self.card_edited)
+        del self.cards[index]
+        self.schedule_session_save()
         self.tabs.removeTab(index)
 
+    def cards_settings(self):
+        """Get the checked items of every card, as the data_settings entries"""
+
+        # The cards models are kept up to date by the widgets' signals, unchanged cards reuse their entry
+        return {"Card n°" + str(card_index + 1): card.to_settings() for card_index, card in enumerate(self.cards)}
+
     def save_the_list(self):
         """Save checked items in each tab's lists"""
         
-        # Initialization of the dictionary
-        self.data_settings = {"Card n°" + str(i + 1) : {"Frtd":[],"Tc":[],"Volt":[]} for i in range(self.tabs.count())}
-
-        # Loop over the tabs - hence the different cards
-        self.nb_cards = (self.tabs.count())
-        for tab_index in range(self.tabs.count()):
-            tab = self.tabs.widget(tab_index)
-            layout = tab.layout()
-            self.data_settings["Card n°" + str(tab_index + 1)]["settings"] = {"name": tab.card_name.text(),
-                                                                              "number": tab.number.text(),
-                                                                              "info": tab.info.text()}
-            # Loop over each tab widget
-            for i in range(layout.count()):
-                widget = layout.itemAt(i).widget()
-                # Action if the widget is a checkBoxList
-                if isinstance(widget, CheckBoxListWidget):
-                    # Loop over each checkable item in the box
-                    for j in range(widget.count()):
-                        item = widget.item(j)
-                        # If the item is checked, append it to the right list in the dictionary
-                        if item.checkState() == Qt.Checked:
-                            if layout.itemAt(i-2).widget().text() == "FRTD":
-                                self.data_settings["Card n°" + str(tab_index + 1)]["Frtd"].append(item.text())
-                            elif layout.itemAt(i-2).widget().text() == "Tc":
-                                self.data_settings["Card n°" + str(tab_index + 1)]["Tc"].append(item.text())
-                            elif layout.itemAt(i-2).widget().text() == "Volt":
-                                self.data_settings["Card n°" + str(tab_index + 1)]["Volt"].append(item.text())
-                                
-        # Check if user input allow a working toml config toml file
-        # If some thermocouples are registered, check if a FRTD is registered too
-        for card in self.data_settings:
-            if len(self.data_settings[card]["Tc"]) > 0 and len(self.data_settings[card]["Frtd"]) == 0:
-                print(card + " : Des thermocouples sont renseignés sans Frtd")
-                
-        # Check if there's no sensors attributed to a same channel
-            LFrtd = self.data_settings[card]["Frtd"]
-            LTc = self.data_settings[card]["Tc"]
-            LVolt = self.data_settings[card]["Volt"]
-            
-            for e in LFrtd:
-                if e in LTc:
-                    print(card + " : Le canal "
-                          + e + " est assigné à un frtd et à au moins un thermocouple.")
-                if e in LVolt:
-                    print(card + " : Le canal "
-                          + e + " est assigné à un frtd et à au moins un autre capteur.")
-            for e in LTc:
-                if e in LVolt:
-                    print(card + " : Le canal "
-                          + e + " est assigné à un thermocouple et à au moins à un autre capteur.")
-                
-        print('Lists successfully saved :)')
-        
+        self.nb_cards = len(self.cards)
+        self.data_settings = self.cards_settings()
+
+        # The issues are found while the user checks the channels, only summed up here
+        issues = [card.name + " : " + issue for card in self.cards for issue in self.validator.issues(card)]
+        if issues:
+            self.statusBar().showMessage(f"Lists saved with {len(issues)} issue(s) - " + issues[0])
+        else:
+            self.statusBar().showMessage("Lists successfully saved :)")
+
     def generate_toml(self):
-        """Generate the toml file"""
-        
+        """Generate the toml file in a worker thread, the window staying responsive"""
+
+        if self.worker is not None:
+            self.statusBar().showMessage("A tolm file is already being generated")
+            return
+
         # Try / except combination to allow the user to use standard Keithlkey info
         try:
-            self.INSTRUMENT01 = Keithley2700(name="INSTRUMENT01",
-                                             title=self.keithley_settings['title'],
-                                             rsrc_name_example=self.keithley_settings["rsrc_name_example"],
-                                             rsrc_name=self.keithley_settings["rsrc_name"],
-                                             model_name=self.keithley_settings["model_name"],
-                                             panel=self.keithley_settings["panel"],
-                                             termination_character=self.keithley_settings["termination_character"],
-                                             sensors_settings=self.sensors_settings)
+            keithley_settings = dict(self.keithley_settings, name="INSTRUMENT01")
+            sensors_settings = self.sensors_settings
         except AttributeError:
-            self.INSTRUMENT01 = Keithley2700(
-                name="INSTRUMENT01",
-                title="Instrument in wich is plugged the switching module used for data acquisition",
-                rsrc_name_example=["ASRL1::INSTR", "TCPIP::192.168.01.01::1394::SOCKET"],
-                rsrc_name="ASRL7::INSTR",
-                model_name="2701",
-                panel="rear",
-                termination_character="Keithley must be set to LF",
-                sensors_settings={'Frtd': {'mode': 'temp',
-                                           'transducer': 'frtd',
-                                           'type': 'pt100',
-                                           'resolution': '6',
-                                           'nplc': '5'},
-                                  'Tc': {'mode': 'temp',
-                                         'transducer': 'tc',
-                                         'type': 'K',
-                                         'ref_junc': 'ext',
-                                         'resolution': '6',
-                                         'nplc': '5'},
-                                  'Volt': {'mode': 'Volt:dc'}})
-
-        # Add every card registered by the user in the object instrument
-        for i in range(0, self.nb_cards):
-            self.INSTRUMENT01.add_module(name=self.data_settings["Card n°" + str(i + 1)]["settings"]["name"],
-                                         number=self.data_settings["Card n°" + str(i + 1)]["settings"]["number"],
-                                         info=self.data_settings["Card n°" + str(i + 1)]["settings"]["info"])
-            # For each card, get the sensors info
-            for channel in self.data_settings["Card n°" + str(i + 1)]["Frtd"]:
-                self.INSTRUMENT01.modules[-1].config_channel(nb_channel=channel, sensor="frtd")
-            
-            for channel in self.data_settings["Card n°" + str(i + 1)]["Tc"]:
-                self.INSTRUMENT01.modules[-1].config_channel(nb_channel=channel, sensor="tc")
-                
-            for channel in self.data_settings["Card n°" + str(i + 1)]["Volt"]:
-                self.INSTRUMENT01.modules[-1].config_channel(nb_channel=channel, sensor="Volt")
-                
-        # Write the toml file
-        self.INSTRUMENT01.write_tolm(getAFilesPathToSave())
-            
+            keithley_settings = DEFAULT_KEITHLEY_SETTINGS
+            sensors_settings = DEFAULT_SENSORS_SETTINGS
+
+        output_path = getAFilesPathToSave("Save the tolm file", [('Toml files', '*.toml'), ('All files', '*.*')])
+        if not output_path:
+            return
+        # The cards as they are now, saved or not
+        self.worker = GenerationWorker(keithley_settings, sensors_settings, self.cards_settings(), output_path)
+        self.worker.signals.progress.connect(self.generation_progress)
+        self.worker.signals.finished.connect(self.generation_finished)
+        self.worker.signals.cancelled.connect(self.generation_cancelled)
+        self.worker.signals.failed.connect(self.generation_failed)
+
+        self.progress_bar.setRange(0, 0)  # Busy until the first section is rendered
+        self.progress_bar.show()
+        self.cancel_button.show()
+        self.button_generate.setEnabled(False)
+        self.statusBar().showMessage("Generating the tolm file...")
+        QThreadPool.globalInstance().start(self.worker)
+
+    def cancel_generation(self):
+        """Stop the running generation"""
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def generation_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+
+    def generation_finished(self, path, written):
+        self.INSTRUMENT01 = self.worker.instrument
+        self.end_generation("Your tolm file has been successfully generated : " + path if written
+                            else "Your tolm file is already up to date : " + path)
+
+    def generation_cancelled(self, path):
+        self.end_generation("Generation cancelled, " + path + " was left untouched")
+
+    def generation_failed(self, path, error):
+        self.end_generation("The generation of " + path + " failed : " + error)
+
+    def end_generation(self, message):
+        """Hide the progress widgets and tell the user how the generation ended"""
+        self.worker = None
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+        self.button_generate.setEnabled(True)
+        self.statusBar().showMessage(message)
+
+
+# Functions definitions
+def build_instrument(keithley_settings: dict, sensors_settings: dict, data_settings: dict):
+    """Build the Keithley2700 described by the settings and the cards of MainWindow.data_settings"""
+
+    instrument = Keithley2700(sensors_settings=sensors_settings, **keithley_settings)
+
+    # Add every card registered by the user in the object instrument
+    for card in data_settings.values():
+        instrument.add_module(name=card["settings"]["name"],
+                              number=card["settings"]["number"],
+                              info=card["settings"]["info"])
+        # For each card, get the sensors info
+        for channel in card["Frtd"]:
+            instrument.modules[-1].config_channel(nb_channel=channel, sensor="frtd")
+
+        for channel in card["Tc"]:
+            instrument.modules[-1].config_channel(nb_channel=channel, sensor="tc")
+
+        for channel in card["Volt"]:
+            instrument.modules[-1].config_channel(nb_channel=channel, sensor="Volt")
+    return instrument
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    main_window = MainWindow(keithleyChannelList=[str(e) for e in range(101, 141)])
+    main_window = MainWindow(keithleyChannelList=[str(e) for e in range(101, 141)], session_path=SESSION_PATH)
     main_window.show()
     app.exec_()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Aug  1 10:23:16 2022
+
+@author: YB263935
+
+The helpers are split into submodules, only imported (with their heavy
+libraries) the first time one of their names is used :
+
+    paths    chemins de fichiers et de dossiers, boîtes de dialogue (tkinter)
+    lvm      fichiers lvm (pandas)
+    hdf5     fichiers h5 de PyMoDAQ (numpy, pandas, h5py)
+    pickles  fichiers pickle
+    excel    fichiers Excel (openpyxl)
+    pdf      gestion des pdfs (PyPDF2)
+    widgets  widgets PyQt5
+
+"from utilities import getAFilesPath" thus only loads utilities.paths.
+"""
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+                                UTILITIES
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+
+# Imports
+import importlib
+
+# Name -> submodule defining it
+_LAZY_NAMES = {
+    "getAFilesPath": "paths", "getFilesPaths": "paths", "getADirsPath": "paths", "create_folder": "paths",
+    "getAFilesPathToSave": "paths", "files_name_to_list": "paths", "FileDialogs": "paths", "file_dialogs": "paths",
+    "lvm_to_df": "lvm",
+    "channel_attr_to_dict": "hdf5", "get_card_data_into_dataframe": "hdf5", "h5py_to_dataframe": "hdf5",
+    "iter_h5py_chunks": "hdf5", "read_time_window": "hdf5", "map_scan": "hdf5", "map_card_signals": "hdf5",
+    "find_h5_files": "hdf5", "load_campaign": "hdf5",
+    "save_as_pickle": "pickles", "read_pickle": "pickles",
+    "load_workbook": "excel",
+    "extractFromPdf": "pdf", "mergePdf": "pdf",
+    "Widget": "widgets", "getElementFromWidgetList": "widgets",
+}
+_SUBMODULES = frozenset(_LAZY_NAMES.values())
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name):
+
+    """Import the submodule defining a name the first time it is asked for (PEP 562)"""
+
+    if name in _LAZY_NAMES:
+        value = getattr(importlib.import_module("." + _LAZY_NAMES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # Next accesses skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
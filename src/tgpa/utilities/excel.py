@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Aug  1 10:23:16 2022
+
+@author: YB263935
+
+Fichiers Excel
+"""
+
+# Imports
+from openpyxl import load_workbook  # noqa: F401
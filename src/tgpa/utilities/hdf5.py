@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Aug  1 10:23:16 2022
+
+@author: YB263935
+
+Fichiers h5 : convertir en dataframe les fichiers de mesures PyMoDAQ
+"""
+
+# Imports
+import os
+import time as timer
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import h5py
+
+H5_EXTENSIONS = (".h5", ".hdf5")  # Extensions of the files a campaign folder is searched for
+TIME_INDEX_STRIDE = 4096  # One time out of TIME_INDEX_STRIDE kept in the cached time indexes
+TIME_INDEXES_SIZE = 64  # Number of scans whose sparse time index is kept, the least recently used are dropped
+_time_indexes = {}  # (file, scan, detector, axes) -> (modification, size, sparse time index), oldest use first
+
+
+def channel_attr_to_dict(channel):
+    
+    """Get a signal's attributes (channel, ...)"""
+    
+    # Get and shape channel's attributes
+    channel = str(channel.attrs["label"]).replace("{","")  # Withdraw "{"
+    channel = channel.replace("}","")[1:][1:][:-1].split(',')  # withdraw "}"
+    channel = [e.split(':') for e in channel]  # withdraw ":"
+    
+    # Get those attributes in a dictionary
+    dict1 = {}
+    for e in channel:
+        dict1[e[0].split('"')[1]] = e[1].split('"')[1]
+    return dict1
+
+
+def card_channels(card):
+    
+    """Get the channels' number of a card's signals, in the card's order"""
+    
+    Ldict = [channel_attr_to_dict(card[e]) for e in card]  # Get dictionaries with channels' number
+    Lchannels = [e["data"].split("\'")[1][:-1] for e in Ldict]
+    return [e.split(" ")[-1] for e in Lchannels]
+
+
+def get_card_data_into_dataframe(card, time):
+    
+    """Get all signals' data into a table, referenced with their channel"""
+    
+    data = read_card_rows([card[e] for e in card], 0, len(time))
+    
+    # The transposed view is the block pandas stores : no copy
+    return pd.DataFrame(data.T, columns=card_channels(card), index=time, copy=False)
+
+
+def read_card_rows(datasets, start, stop):
+    
+    """Read the rows start:stop of a card's signals into a (signals, rows) array"""
+    
+    # One row per signal, each dataset read once straight into its row (first column of the dataset)
+    data = np.empty((len(datasets), stop - start), dtype=np.result_type(*[e.dtype for e in datasets]))
+    for i, dataset in enumerate(datasets):
+        dataset.read_direct(data, np.s_[start:stop, 0], np.s_[i])
+    return data
+
+
+def time_index(axis):
+    
+    """Get the time axis of a scan (seconds since epoch) as a DatetimeIndex in Paris' time zone"""
+    
+    return pd.to_datetime(axis[()], unit='s', utc=True).tz_convert('Europe/Paris')
+
+
+def h5py_to_dataframe(h5py_file_path, scan:str, detector:str,axes:str, data:str,cards:[str]) :
+    
+    """Get data from h5py file into a dataframe table"""
+    
+    with h5py.File(h5py_file_path, "r",locking=False) as f:
+        
+        # Get time information
+        time = time_index(f['RawData'][scan][detector][axes]["Axis00"])
+
+        # Get the card's data
+        Lcard = [f['RawData'][scan][detector][data][card] for card in cards]
+        
+        # Get the cards data into a dataframe
+        dfs = [get_card_data_into_dataframe(card,time) for card in Lcard]
+        
+    return dfs
+
+
+def aligned_chunk_rows(datasets, rows):
+    
+    """Round a number of rows down to a multiple of the largest HDF5 chunk rows of the datasets (at least one chunk)
+    
+    Aligning on every chunk size at once (their least common multiple) could make a
+    single block of a whole scan : the blocks are aligned on the largest chunks only,
+    and never hold more than max(rows, largest chunk rows) rows. A smaller chunk which
+    straddles two blocks is read twice."""
+    
+    chunk_rows = [e.chunks[0] for e in datasets if e.chunks]
+    if not chunk_rows:  # Contiguous datasets : any number of rows reads as well
+        return max(1, rows)
+    step = max(chunk_rows)
+    return max(step, rows // step * step)
+
+
+def iter_h5py_chunks(h5py_file_path, scan:str, detector:str, axes:str, data:str, cards:[str], rows=100_000,
+                     as_arrays=False):
+    
+    """Read a scan block of rows by block of rows, in bounded memory
+    
+    Yields, for each block, the list of the cards' DataFrames (as h5py_to_dataframe
+    returns them, on the block's times), or (times in seconds, [(signals, rows) arrays])
+    with as_arrays. The blocks hold about rows rows, aligned on the largest HDF5 chunks
+    (see aligned_chunk_rows)."""
+    
+    with h5py.File(h5py_file_path, "r", locking=False) as f:
+        
+        # Get the time axis and the card's signals
+        axis = f['RawData'][scan][detector][axes]["Axis00"]
+        Lcard = [f['RawData'][scan][detector][data][card] for card in cards]
+        Ldatasets = [[card[e] for e in card] for card in Lcard]
+        Lchannels = [card_channels(card) for card in Lcard]
+        
+        nb_rows = min([axis.shape[0]] + [e.shape[0] for datasets in Ldatasets for e in datasets])
+        step = aligned_chunk_rows([axis] + [e for datasets in Ldatasets for e in datasets], rows)
+        
+        for start in range(0, nb_rows, step):
+            stop = min(start + step, nb_rows)
+            seconds = axis[start:stop]
+            blocks = [read_card_rows(datasets, start, stop) for datasets in Ldatasets]
+            if as_arrays:
+                yield seconds, blocks
+            else:
+                time = time_index(seconds)
+                yield [pd.DataFrame(block.T, columns=channels, index=time, copy=False)
+                       for block, channels in zip(blocks, Lchannels)]
+
+
+def to_seconds(moment):
+    
+    """Get a moment (seconds since epoch, datetime, Timestamp or string, Paris' time if naive) in seconds"""
+    
+    if isinstance(moment, (int, float, np.number)):
+        return float(moment)
+    moment = pd.Timestamp(moment)
+    if moment.tzinfo is None:
+        moment = moment.tz_localize('Europe/Paris')
+    return moment.timestamp()
+
+
+def sparse_time_index(h5py_file_path, axis, key):
+    
+    """Get one time out of TIME_INDEX_STRIDE of a scan's time axis, read once per file version
+    
+    Only the index of the file's last version is kept, for the TIME_INDEXES_SIZE scans
+    used last."""
+    
+    stat = os.stat(h5py_file_path)
+    key = (os.path.abspath(h5py_file_path),) + key
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _time_indexes.pop(key, None)  # Put back last : the most recently used
+    if cached is None or cached[:2] != version:  # Not read yet, or read from a previous version of the file
+        cached = version + (axis[::TIME_INDEX_STRIDE],)
+    _time_indexes[key] = cached
+    while len(_time_indexes) > TIME_INDEXES_SIZE:
+        del _time_indexes[next(iter(_time_indexes))]
+    return cached[2]
+
+
+def search_time(axis, index, moment, side):
+    
+    """Binary search a time in a sorted time axis : in its sparse index, then in one stride of the axis"""
+    
+    i = int(np.searchsorted(index, moment, side))
+    lo = max(i - 1, 0) * TIME_INDEX_STRIDE
+    hi = min(i * TIME_INDEX_STRIDE + 1, axis.shape[0])
+    return lo + int(np.searchsorted(axis[lo:hi], moment, side))
+
+
+def read_time_window(h5py_file_path, scan:str, start, end, detector:str = "Detector000", axes:str = "NavAxes",
+                     data:str = "Data0D", cards:[str] = None):
+    
+    """Get the cards' data between two moments (both included) into dataframes, as h5py_to_dataframe
+    
+    Only the matching rows of each signal are read from the file. The moments are seconds
+    since epoch, datetimes, Timestamps or strings (Paris' time if naive). cards defaults
+    to every card of the scan."""
+    
+    with h5py.File(h5py_file_path, "r", locking=False) as f:
+        
+        # Get the rows of the window
+        axis = f['RawData'][scan][detector][axes]["Axis00"]
+        index = sparse_time_index(h5py_file_path, axis, (scan, detector, axes))
+        lo = search_time(axis, index, to_seconds(start), 'left')
+        hi = max(lo, search_time(axis, index, to_seconds(end), 'right'))
+        time = time_index(axis[lo:hi])
+        
+        # Get the card's data, rows lo to hi only
+        group = f['RawData'][scan][detector][data]
+        Lcard = [group[card] for card in (cards if cards is not None else group)]
+        dfs = [pd.DataFrame(read_card_rows([card[e] for e in card], lo, hi).T, columns=card_channels(card),
+                            index=time, copy=False) for card in Lcard]
+        
+    return dfs
+
+
+def memmap_dataset(dataset):
+    
+    """Get a read-only np.memmap view of a dataset in its file, None if its data is not stored as one
+    plain block (chunked, compressed, external, virtual or not written yet)"""
+    
+    if dataset.chunks is not None or dataset.external or dataset.is_virtual or dataset.dtype.hasobject:
+        return None
+    if dataset.file.driver != "sec2" or dataset.file.userblock_size:  # Offsets only valid on a plain file
+        return None
+    offset = dataset.id.get_offset()
+    if offset is None:
+        return None
+    return np.memmap(dataset.file.filename, mode="r", dtype=dataset.dtype, offset=offset, shape=dataset.shape)
+
+
+def read_signal(dataset):
+    
+    """Get a signal's values (first column of the dataset) : a view of the file when it can be mapped,
+    else read through h5py"""
+    
+    values = memmap_dataset(dataset)
+    if values is None:
+        values = dataset[()]
+    return values[:, 0] if values.ndim > 1 else values
+
+
+def map_card_signals(card):
+    
+    """Get {channel: values} of a card's signals, zero-copy views of the file where possible"""
+    
+    return dict(zip(card_channels(card), [read_signal(card[e]) for e in card]))
+
+
+def map_scan(h5py_file_path, scan:str, detector:str, axes:str, data:str, cards:[str]):
+    
+    """Get the time axis (seconds since epoch) and the {channel: values} of each card of a scan
+    
+    Contiguous uncompressed datasets are memory mapped : nothing is copied, every
+    pass over the values reads the page cache. The views stay valid after the
+    HDF5 file is closed, as long as the file is not rewritten."""
+    
+    with h5py.File(h5py_file_path, "r", locking=False) as f:
+        seconds = read_signal(f['RawData'][scan][detector][axes]["Axis00"])
+        signals = [map_card_signals(f['RawData'][scan][detector][data][card]) for card in cards]
+    return seconds, signals
+
+
+def find_h5_files(directory):
+    
+    """Get the HDF5 files of a folder and of its subfolders, sorted"""
+    
+    return sorted(os.path.join(files_path, name) for files_path, _, names in os.walk(directory)
+                  for name in names if name.lower().endswith(H5_EXTENSIONS))
+
+
+def list_cards(h5py_file_path, scans:[str], detector:str, data:str, cards:[str]):
+    
+    """Get the (scan, card) pairs of a file, every scan / card when scans / cards is None"""
+    
+    with h5py.File(h5py_file_path, "r", locking=False) as f:
+        raw = f['RawData']
+        pairs = []
+        for scan in (scans if scans is not None else [e for e in raw if e.startswith("Scan")]):
+            group = raw[scan][detector][data]
+            pairs.extend((scan, card) for card in (cards if cards is not None else group))
+    return pairs
+
+
+def load_card(task):
+    
+    """Load one card of one scan of one file : (file, scan, detector, axes, data, card) ->
+    (task, DataFrame or None, elapsed time, error message or None)"""
+    
+    h5py_file_path, scan, detector, axes, data, card = task
+    start = timer.perf_counter()
+    try:
+        with h5py.File(h5py_file_path, "r", locking=False) as f:  # Each process opens the file by itself
+            group = f['RawData'][scan][detector]
+            df = get_card_data_into_dataframe(group[data][card], time_index(group[axes]["Axis00"]))
+    except Exception as error:  # Reported with the results, one card must not stop the others
+        return task, None, timer.perf_counter() - start, f"{type(error).__name__}: {error}"
+    return task, df, timer.perf_counter() - start, None
+
+
+def load_campaign(files, scans:[str] = None, detector:str = "Detector000", axes:str = "NavAxes",
+                  data:str = "Data0D", cards:[str] = None, workers:int = None, concat:bool = False):
+    
+    """Load the cards of many acquisition files at once, files and cards being read by a process pool
+    
+    files is a folder (searched with its subfolders) or a list of files. Returns
+    (frames, timings, errors) :
+        frames   {(file, scan, card): DataFrame}, or with concat one DataFrame indexed
+                 by file, scan, card and time
+        timings  {file: seconds spent reading it, summed over its cards}
+        errors   {(file, scan, card): message}, scan and card being None when the
+                 file itself could not be read"""
+    
+    if isinstance(files, (str, os.PathLike)):
+        files = find_h5_files(files)
+    
+    # The cards to load, listed from the files' metadata only
+    tasks = []
+    timings = {}
+    errors = {}
+    for h5py_file_path in files:
+        start = timer.perf_counter()
+        try:
+            pairs = list_cards(h5py_file_path, scans, detector, data, cards)
+        except Exception as error:
+            errors[(h5py_file_path, None, None)] = f"{type(error).__name__}: {error}"
+            pairs = []
+        timings[h5py_file_path] = timer.perf_counter() - start
+        tasks.extend((h5py_file_path, scan, detector, axes, data, card) for scan, card in pairs)
+    
+    # One task per card, results in the files' order (in this process when a pool would only cost)
+    frames = {}
+    parallel = min(workers or os.cpu_count() or 1, len(tasks)) > 1
+    executor = ProcessPoolExecutor(max_workers=workers) if parallel else None
+    try:
+        for task, df, elapsed, error in (executor.map if parallel else map)(load_card, tasks):
+            key = (task[0], task[1], task[5])
+            timings[task[0]] += elapsed
+            if error is not None:
+                errors[key] = error
+            else:
+                frames[key] = df
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    if concat:
+        frames = pd.concat(frames, names=["file", "scan", "card", "time"]) if frames else pd.DataFrame()
+    return frames, timings, errors
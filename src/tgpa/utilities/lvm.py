@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Aug  1 10:23:16 2022
+
+@author: YB263935
+
+Fichiers lvm : convertir en dataframe des fichiers de mesures LabVIEW
+"""
+
+# Imports
+import pandas as pd
+
+
+def lvm_to_df(lvm_file_path, skiprows=22):
+    
+    """Converti un fichier lvm en dataframe"""
+    # Note : La longueur de l'en-tête, fixée à 22, est un paramètre modifiable
+    
+    return(pd.read_csv(lvm_file_path, sep='\t', on_bad_lines='skip',
+                       skiprows=skiprows, decimal=','))
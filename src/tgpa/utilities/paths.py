@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Aug  1 10:23:16 2022
+
+@author: YB263935
+
+Gestion des chemins : récupérer, acquérir des chemins de dossiers et/ou fichiers
+"""
+
+# Imports
+import os
+import sys
+from os import walk
+
+DEFAULT_FILETYPES = [('All files', '*.*')]
+
+
+class FileDialogs:
+
+    """Service de boîtes de dialogue de fichiers, partagé par toute l'application
+
+    Utilise QFileDialog quand une application Qt tourne, sinon tkinter avec une
+    seule fenêtre racine cachée, créée au premier appel puis réutilisée. Les
+    chemins sont renvoyés sans ouvrir les fichiers (None, ou () pour plusieurs
+    fichiers, si l'utilisateur annule) et le dernier dossier visité est retenu."""
+
+    def __init__(self):
+        self.last_directory = os.getcwd()  # Dossier d'ouverture de la prochaine boîte de dialogue
+        self._tk_root = None
+
+    @staticmethod
+    def qt_application():
+
+        """Renvoie l'application Qt en cours, None s'il n'y en a pas (PyQt5 n'est pas importé pour autant)"""
+
+        widgets = sys.modules.get("PyQt5.QtWidgets")
+        return widgets.QApplication.instance() if widgets is not None else None
+
+    def tk_root(self):
+
+        """Renvoie la fenêtre racine tkinter cachée, créée une seule fois"""
+
+        if self._tk_root is None:
+            import tkinter as tk  # Only loaded when a dialog is opened without Qt
+            self._tk_root = tk.Tk()
+            self._tk_root.withdraw()
+        return self._tk_root
+
+    @staticmethod
+    def qt_filter(filetypes):
+
+        """Convertit des types de fichiers tkinter [(nom, motif(s))] en filtre QFileDialog"""
+
+        return ";;".join(f"{name} ({pattern if isinstance(pattern, str) else ' '.join(pattern)})"
+                         for name, pattern in filetypes)
+
+    def _remember(self, paths):
+
+        """Retient le dossier du dernier chemin choisi"""
+
+        if paths:
+            path = paths if isinstance(paths, str) else paths[0]
+            self.last_directory = path if os.path.isdir(path) else os.path.dirname(path)
+
+    def open_file(self, title=None, filetypes=DEFAULT_FILETYPES):
+
+        """Renvoie le chemin vers un fichier existant"""
+
+        app = self.qt_application()
+        if app is not None:
+            from PyQt5.QtWidgets import QFileDialog
+            path, _ = QFileDialog.getOpenFileName(app.activeWindow(), title or "", self.last_directory,
+                                                  self.qt_filter(filetypes))
+        else:
+            from tkinter import filedialog
+            path = filedialog.askopenfilename(parent=self.tk_root(), title=title, initialdir=self.last_directory,
+                                              filetypes=filetypes)
+        self._remember(path)
+        return path or None
+
+    def open_files(self, title=None, filetypes=DEFAULT_FILETYPES):
+
+        """Renvoie les chemins respectifs de plusieurs fichiers existants"""
+
+        app = self.qt_application()
+        if app is not None:
+            from PyQt5.QtWidgets import QFileDialog
+            paths, _ = QFileDialog.getOpenFileNames(app.activeWindow(), title or "", self.last_directory,
+                                                    self.qt_filter(filetypes))
+        else:
+            from tkinter import filedialog
+            paths = filedialog.askopenfilenames(parent=self.tk_root(), title=title, initialdir=self.last_directory,
+                                                filetypes=filetypes)
+        self._remember(paths)
+        return tuple(paths)
+
+    def directory(self, title=None):
+
+        """Renvoie le chemin vers un dossier"""
+
+        app = self.qt_application()
+        if app is not None:
+            from PyQt5.QtWidgets import QFileDialog
+            path = QFileDialog.getExistingDirectory(app.activeWindow(), title or "", self.last_directory)
+        else:
+            from tkinter import filedialog
+            path = filedialog.askdirectory(parent=self.tk_root(), title=title, initialdir=self.last_directory)
+        self._remember(path)
+        return path or None
+
+    def save_file(self, title=None, filetypes=DEFAULT_FILETYPES):
+
+        """Renvoie un chemin pour un fichier à sauvegarder, sans le créer"""
+
+        app = self.qt_application()
+        if app is not None:
+            from PyQt5.QtWidgets import QFileDialog
+            path, _ = QFileDialog.getSaveFileName(app.activeWindow(), title or "", self.last_directory,
+                                                  self.qt_filter(filetypes))
+        else:
+            from tkinter import filedialog
+            path = filedialog.asksaveasfilename(parent=self.tk_root(), title=title, initialdir=self.last_directory,
+                                                filetypes=filetypes)
+        self._remember(path)
+        return path or None
+
+
+file_dialogs = FileDialogs()  # Service used by the functions below
+
+
+def getAFilesPath(window_title = None, filetypes  = DEFAULT_FILETYPES) :
+    
+    """Renvoie le chemin vers un fichier"""
+    
+    return file_dialogs.open_file(window_title, filetypes)
+
+
+def getFilesPaths(window_title = None) :
+    
+    """Renvoie les chemins respectifs de plusieurs fichiers dans une liste"""
+    
+    return file_dialogs.open_files(window_title)
+
+
+def getADirsPath(window_title = None):
+    
+    """Renvoie le chemin vers un dossier"""
+    
+    return file_dialogs.directory(window_title)
+
+
+def create_folder(name):
+    
+    """ create a folder """
+    
+    if not os.path.exists(name):
+        os.makedirs(name)
+
+
+def getAFilesPathToSave(window_title = None, filetypes  = DEFAULT_FILETYPES) :
+    
+    """Renvoie un chemin pour un fichier à sauvegarder"""
+    
+    return file_dialogs.save_file(window_title, filetypes)
+
+
+def files_name_to_list(path):
+    
+    """ Renvoie une liste contenant les noms des fichiers excels des essais de
+    Devenir"""
+    # Instancie la liste des noms de fichiers
+    listeFichiers = [fichiers for (files_path, sousRepertoires, fichiers) in walk(path)]
+    
+    # for (files_path, sousRepertoires, fichiers) in walk(path):  # Ajoute les noms
+    #     listeFichiers.extend(fichiers)
+        
+    for i in range(0, len(listeFichiers)) :
+        listeFichiers[i] = path + '/' + listeFichiers[i]
+
+    return listeFichiers  # Retourne la liste des noms et le chemin absolu
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Aug  1 10:23:16 2022
+
+@author: YB263935
+
+Fichiers pickle : enregistrer et relire des structures Python
+"""
+
+# Imports
+import pickle
+
+
+def save_as_pickle(name_pickle_out, structure_to_store):
+    
+    """Enregistre un DataFrame en format pickel"""
+    
+    output = open(name_pickle_out, 'wb')
+    pickle.dump(structure_to_store, output)
+    output.close()
+
+
+def read_pickle(input_file):
+    
+    """Ouvre un pickle en format dataframe"""
+    
+    dictload = pickle.load(open(input_file, 'rb'))
+    return dictload
@@ -0,0 +1,52 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Shared fixtures of the tests
+"""
+
+# Imports
+import os
+import sys
+
+import pytest
+
+# The sources are flat scripts importing each other by name
+SOURCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "tgpa")
+sys.path.insert(0, SOURCES)
+
+from keithleyDataClass import Keithley2700, DEFAULT_KEITHLEY_SETTINGS, DEFAULT_SENSORS_SETTINGS  # noqa: E402
+
+
+# Functions definitions
+
+
+def build_keithley(modules: dict, name: str = "INSTRUMENT01"):
+
+    """Build an instrument from {module name: (card number, {"frtd": [...], "tc": [...], "Volt": [...]})}"""
+
+    settings = dict(DEFAULT_KEITHLEY_SETTINGS, name=name)
+    instrument = Keithley2700(sensors_settings=DEFAULT_SENSORS_SETTINGS, **settings)
+    for module_name, (number, sensors) in modules.items():
+        instrument.add_module(module_name, number, "Info of " + module_name)
+        for sensor, channels in sensors.items():
+            for channel in channels:
+                instrument.modules[-1].config_channel(channel, sensor)
+    return instrument
+
+
+@pytest.fixture
+def bench():
+
+    """An instrument with two configured cards and an empty one"""
+
+    return build_keithley({"MODULE01": ("7706", {"frtd": ["101"], "tc": ["102", "103", "104"], "Volt": ["110"]}),
+                           "MODULE02": ("7702", {"frtd": ["201"], "tc": ["213", "214"], "Volt": ["240"]}),
+                           "MODULE03": ("7702", {})})
+
+
+@pytest.fixture
+def make_keithley():
+
+    """build_keithley, for the tests building their own instruments"""
+
+    return build_keithley
@@ -0,0 +1,83 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test the generation of many benches from a manifest
+"""
+
+# Imports
+import batchGenerator
+
+# Constants
+CSV_MAP = """module,number,info,channel,sensor
+MODULE01,7706,Info of MODULE01,101,frtd
+MODULE01,7706,Info of MODULE01,102,tc
+MODULE01,7706,Info of MODULE01,103,tc
+MODULE01,7706,Info of MODULE01,104,tc
+MODULE01,7706,Info of MODULE01,110,volt
+MODULE02,7702,Info of MODULE02,201,frtd
+MODULE02,7702,Info of MODULE02,213,tc
+MODULE02,7702,Info of MODULE02,214,tc
+MODULE02,7702,Info of MODULE02,240,volt
+"""
+TOML_MAP = """[[modules]]
+name = "MODULE01"
+number = "7706"
+info = "Info of MODULE01"
+frtd = ["101"]
+tc = ["102", "103", "104"]
+Volt = ["110"]
+
+[[modules]]
+name = "MODULE02"
+number = 7702
+info = "Info of MODULE02"
+frtd = [201]
+tc = [213, 214]
+Volt = [240]
+"""
+MANIFEST = """[defaults]
+rsrc_name = "ASRL3::INSTR"
+label = "Not a setting of the instrument"
+
+[[bench]]
+channel_map = "bench.csv"
+output = "out/csv.toml"
+
+[[bench]]
+channel_map = "bench.toml"
+output = "out/toml.toml"
+label = "Bench 2"
+
+[[bench]]
+output = "out/missing.toml"
+
+[[bench]]
+channel_map = "bench.toml"
+output = "out/same.toml"
+"""
+
+
+# Tests
+
+
+def test_manifest(tmp_path, capsys, make_keithley):
+    (tmp_path / "bench.csv").write_text(CSV_MAP)
+    (tmp_path / "bench.toml").write_text(TOML_MAP)
+    (tmp_path / "manifest.toml").write_text(MANIFEST)
+    expected = make_keithley({"MODULE01": ("7706", {"frtd": ["101"], "tc": ["102", "103", "104"], "Volt": ["110"]}),
+                              "MODULE02": ("7702", {"frtd": ["201"], "tc": ["213", "214"], "Volt": ["240"]})})
+    expected.rsrc_name = "ASRL3::INSTR"
+    (tmp_path / "out").mkdir()
+    expected.update_tolm(str(tmp_path / "out" / "same.toml"))
+
+    assert batchGenerator.main([str(tmp_path / "manifest.toml"), "-j", "2"]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines[:4]] == ["OK", "OK", "FAIL", "SAME"]
+    assert lines[2].endswith("missing.toml : Missing channel_map")
+    assert lines[4].startswith("2 generated, 1 unchanged, 1 failed")
+
+    # The csv and toml maps describe the same bench
+    content = (tmp_path / "out" / "same.toml").read_text()
+    assert (tmp_path / "out" / "csv.toml").read_text() == content
+    assert (tmp_path / "out" / "toml.toml").read_text() == content
+    assert not (tmp_path / "out" / "missing.toml").exists()
@@ -0,0 +1,61 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test the cards' templates and clones
+"""
+
+# Imports
+import pytest
+
+from cardModel import CardModel
+
+# Constants
+SLOT1 = [str(e) for e in range(101, 141)]
+SLOT2 = [str(e) for e in range(201, 241)]
+
+
+# Functions definitions
+
+
+@pytest.fixture
+def card():
+
+    """A 7702 card of slot 1 with a few checked channels"""
+
+    card = CardModel("MODULE01", "7702", "Bench", SLOT1)
+    card.assign_many({"101": "Frtd", "102": "Tc", "103": "Tc", "140": "Volt"})
+    return card
+
+
+# Tests
+
+
+def test_template_holds_positions(card):
+    assert card.template() == {"number": "7702", "info": "Bench", "Frtd": [0], "Tc": [1, 2], "Volt": [39]}
+
+
+def test_apply_template(card):
+    other = CardModel("MODULE02", "", "", SLOT2)
+    other.assign_many({"201": "Volt", "205": "Tc"})
+    notifications = []
+    other.listeners.append(lambda card, kind, changes: notifications.append(kind))
+    other.apply_template(card.template())
+    assert {sensor: other.checked(sensor) for sensor in ("Frtd", "Tc", "Volt")} == \
+        {"Frtd": ["201"], "Tc": ["202", "203"], "Volt": ["240"]}  # 205 unchecked, 201 switched to Frtd
+    assert other.number == "7702"
+    assert notifications == ["channels", "settings"]  # One per kind of change
+
+
+def test_apply_template_skips_missing_positions(card):
+    short = CardModel("MODULE02", "7702", "", SLOT2[:20])
+    short.apply_template(card.template())
+    assert short.checked("Volt") == []
+    assert short.checked("Tc") == ["202", "203"]
+
+
+def test_clone(card):
+    clone = card.clone("MODULE02", SLOT2)
+    assert (clone.name, clone.number, clone.info) == ("MODULE02", "7702", "Bench")
+    assert clone.template() == card.template()
+    clone.assign("210", "Tc")
+    assert card.checked("Tc") == ["102", "103"]  # Independent of the original
@@ -0,0 +1,115 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test the live checks of the cards' assignments
+"""
+
+# Imports
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cardValidator
+from cardModel import CardModel
+from cardValidator import AssignmentValidator
+
+# Constants
+CHANNELS = [str(e) for e in range(101, 141)]
+
+
+# Functions definitions
+
+
+@pytest.fixture
+def validator():
+
+    """A validator recording the cards it notifies"""
+
+    validator = AssignmentValidator()
+    validator.notified = []
+    validator.listeners.append(validator.notified.append)
+    return validator
+
+
+def add_card(validator, name="MODULE01", number="7706"):
+    card = CardModel(name, number, "", CHANNELS)
+    validator.add_card(card)
+    return card
+
+
+# Tests
+
+
+def test_new_card_without_issue(validator):
+    card = add_card(validator)
+    assert not validator.has_issues(card)
+    assert validator.issues(card) == []
+    assert validator.notified == []
+
+
+def test_thermocouples_without_frtd(validator):
+    card = add_card(validator)
+    card.assign("102", "Tc")
+    assert validator.notified == [card]
+    assert validator.channel_issue(card, "102") == "Des thermocouples sont renseignés sans Frtd"
+    card.assign("103", "Tc")  # Same issue : the tab does not change
+    assert validator.notified == [card]
+    card.assign("101", "Frtd")
+    assert validator.notified == [card, card]
+    assert not validator.has_issues(card)
+
+
+def test_every_new_out_of_range_channel_is_notified(validator):
+    card = add_card(validator)  # A 7706 has 20 channels : 101 to 120
+    card.assign("121", "Volt")
+    assert validator.notified == [card]
+    assert validator.issues(card) == ["Les canaux 121 n'existent pas sur une carte 7706"]
+    card.assign("122", "Volt")
+    assert validator.notified == [card, card]
+    assert validator.issues(card) == ["Les canaux 121, 122 n'existent pas sur une carte 7706"]
+    assert validator.channel_issue(card, "122") == "Le canal 122 n'existe pas sur une carte 7706"
+    assert validator.channel_issue(card, "120") is None
+    card.assign_many({"121": None, "122": None})
+    assert validator.notified == [card, card, card]
+    assert not validator.has_issues(card)
+
+
+def test_card_number_changes_its_range(validator):
+    card = add_card(validator, number="7702")  # 40 channels
+    card.assign("140", "Volt")
+    assert not validator.has_issues(card)
+    card.set_field("number", "7706")
+    assert validator.has_issues(card)
+    card.set_field("number", "")  # Unknown card : every channel of the tab is allowed
+    assert not validator.has_issues(card)
+
+
+def test_duplicate_names(validator):
+    first = add_card(validator)
+    second = add_card(validator, "MODULE02")
+    second.set_field("name", "MODULE01")
+    assert set(validator.notified) == {first, second}
+    assert validator.issues(first) == ["Le nom MODULE01 est donné à plusieurs cartes"]
+    assert validator.duplicate_name(second)
+
+    validator.notified.clear()
+    validator.remove_card(second)
+    assert validator.notified == [first]
+    assert not validator.has_issues(first)
+    second.assign("102", "Tc")  # No longer followed
+    assert validator.notified == [first]
+
+
+def test_modules_are_loaded_once_when_tgpa_is_importable():
+    # The sources import each other by name : with the tgpa package importable too, no module is loaded twice
+    sources = os.path.dirname(os.path.abspath(cardValidator.__file__))
+    code = ("import sys, batchGenerator, cardModel, cardValidator, keithleyDataClass, keithleyDiff, sessionStore\n"
+            "from tgpa.batchGenerator import main\n"
+            "assert cardValidator.CardModel is cardModel.CardModel is sessionStore.CardModel\n"
+            "assert keithleyDiff.Keithley2700 is keithleyDataClass.Keithley2700\n"
+            "assert sys.modules['tgpa.batchGenerator'].Keithley2700 is keithleyDataClass.Keithley2700\n"
+            "assert not [name for name in sys.modules if name.startswith('tgpa.') and name != 'tgpa.batchGenerator']\n")
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join([sources, os.path.dirname(sources)]))
+    subprocess.run([sys.executable, "-c", code], env=environment, check=True)
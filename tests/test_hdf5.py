@@ -0,0 +1,230 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test the loading of PyMoDAQ HDF5 scans of utilities.hdf5
+"""
+
+# Imports
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+h5py = pytest.importorskip("h5py")
+from utilities import hdf5  # noqa: E402
+
+# Constants
+NB_SAMPLES = 1000
+START = 1.7e9  # Time of the first sample, seconds since epoch
+CARDS = {"CH00": (101, 102, 103), "CH01": (201, 202)}  # Card -> channels of its signals
+
+
+# Functions definitions
+
+
+@pytest.fixture
+def scan(tmp_path):
+
+    """A PyMoDAQ HDF5 file with one scan, sampled every half second"""
+
+    path = str(tmp_path / "scan.h5")
+    rng = np.random.default_rng(0)
+    with h5py.File(path, "w") as f:
+        detector = f.create_group("RawData/Scan000/Detector000")
+        detector.create_dataset("NavAxes/Axis00", data=START + 0.5 * np.arange(NB_SAMPLES))
+        for card, channels in CARDS.items():
+            for index, channel in enumerate(channels):
+                dataset = detector.create_dataset(f"Data0D/{card}/Data{index:02d}", data=rng.random((NB_SAMPLES, 1)),
+                                                  chunks=(64, 1))
+                dataset.attrs["label"] = np.bytes_(('{"data": "[\'Temperature ' + str(channel) + '\']"}').encode())
+    return path
+
+
+@pytest.fixture
+def mixed_scan(tmp_path):
+
+    """A compressed scan whose signals have chunks of 997, 1009 and 1013 rows"""
+
+    path = str(tmp_path / "mixed.h5")
+    rng = np.random.default_rng(1)
+    with h5py.File(path, "w") as f:
+        detector = f.create_group("RawData/Scan000/Detector000")
+        detector.create_dataset("NavAxes/Axis00", data=START + 0.5 * np.arange(5 * NB_SAMPLES), chunks=(997,),
+                                compression="gzip")
+        for card, channels in CARDS.items():
+            for index, channel in enumerate(channels):
+                dataset = detector.create_dataset(f"Data0D/{card}/Data{index:02d}",
+                                                  data=rng.random((5 * NB_SAMPLES, 1)),
+                                                  chunks=((1009, 1013)[index % 2], 1), compression="gzip")
+                dataset.attrs["label"] = np.bytes_(('{"data": "[\'Temperature ' + str(channel) + '\']"}').encode())
+    return path
+
+
+def expected_frame(path: str, card: str, lo: int = 0, hi: int = NB_SAMPLES):
+
+    """Get rows lo to hi of a card signal by signal, the way the first version of h5py_to_dataframe did"""
+
+    with h5py.File(path, "r") as f:
+        detector = f["RawData/Scan000/Detector000"]
+        time = [pd.Timestamp(e, unit="s", tz="Europe/Paris") for e in detector["NavAxes/Axis00"][lo:hi]]
+        signals = detector["Data0D"][card]
+        data = [[row[0] for row in signals[name][lo:hi]] for name in signals]
+    return pd.DataFrame(np.array(data).transpose(), columns=[str(c) for c in CARDS[card]], index=time)
+
+
+# Tests
+
+
+def test_h5py_to_dataframe_as_the_first_version(scan):
+    dfs = hdf5.h5py_to_dataframe(scan, "Scan000", "Detector000", "NavAxes", "Data0D", list(CARDS))
+    for df, card in zip(dfs, CARDS):
+        pd.testing.assert_frame_equal(df, expected_frame(scan, card))
+
+
+
+@pytest.mark.parametrize("rows", [1, 100, 300, NB_SAMPLES])
+def test_iter_h5py_chunks_as_a_full_load(scan, rows):
+    blocks = list(hdf5.iter_h5py_chunks(scan, "Scan000", "Detector000", "NavAxes", "Data0D", list(CARDS), rows=rows))
+    assert all(len(dfs[0]) <= max(rows, 64) for dfs in blocks)  # Chunks of 64 rows
+    assert all(len(dfs[0]) % 64 == 0 for dfs in blocks[:-1])
+    for index, card in enumerate(CARDS):
+        pd.testing.assert_frame_equal(pd.concat([dfs[index] for dfs in blocks]), expected_frame(scan, card))
+
+
+@pytest.mark.parametrize("rows", [500, 2000, 100_000])
+def test_iter_h5py_chunks_bounded_with_mixed_chunks(mixed_scan, rows):
+    blocks = list(hdf5.iter_h5py_chunks(mixed_scan, "Scan000", "Detector000", "NavAxes", "Data0D", list(CARDS),
+                                        rows=rows, as_arrays=True))
+    lengths = [len(seconds) for seconds, _ in blocks]
+    assert sum(lengths) == 5 * NB_SAMPLES
+    assert max(lengths) <= max(rows, 1013)  # Never the whole scan because of the chunks' least common multiple
+    assert all(length % 1013 == 0 for length in lengths[:-1])  # Aligned on the largest chunks
+    with h5py.File(mixed_scan, "r") as f:
+        group = f["RawData/Scan000/Detector000/Data0D"]
+        for index, card in enumerate(CARDS):
+            expected = np.stack([group[card][name][:, 0] for name in group[card]])
+            np.testing.assert_array_equal(np.concatenate([signals[index] for _, signals in blocks], axis=1), expected)
+
+
+@pytest.mark.parametrize("stride", [hdf5.TIME_INDEX_STRIDE, 7])  # 7 : the windows cross the sparse index
+@pytest.mark.parametrize("start, end, lo, hi", [
+    (START, START + 10, 0, 21),  # Both ends are samples, both included
+    (START - 100, START + 0.25, 0, 1),  # Before the scan
+    (START + 10.1, START + 10.4, 21, 21),  # Between two samples : empty
+    (START + 498, START + 1000, 996, NB_SAMPLES),  # After the scan
+    (START + 3.5, START + 3.5, 7, 8),  # One sample
+    (START + 20, START + 10, 40, 40),  # End before start : empty
+])
+def test_read_time_window_boundaries(scan, monkeypatch, stride, start, end, lo, hi):
+    monkeypatch.setattr(hdf5, "TIME_INDEX_STRIDE", stride)
+    monkeypatch.setattr(hdf5, "_time_indexes", {})
+    dfs = hdf5.read_time_window(scan, "Scan000", start, end)
+    for df, card in zip(dfs, CARDS):
+        assert len(df) == hi - lo
+        if hi > lo:
+            pd.testing.assert_frame_equal(df, expected_frame(scan, card, lo, hi))
+
+
+def test_read_time_window_moments(scan):
+    first = pd.Timestamp(START, unit="s", tz="Europe/Paris")
+    by_seconds = hdf5.read_time_window(scan, "Scan000", START, START + 2, cards=["CH01"])[0]
+    by_timestamp = hdf5.read_time_window(scan, "Scan000", first, first + pd.Timedelta(seconds=2), cards=["CH01"])[0]
+    by_naive_string = hdf5.read_time_window(scan, "Scan000", str(first.tz_localize(None)),
+                                            str((first + pd.Timedelta(seconds=2)).tz_localize(None)), cards=["CH01"])[0]
+    assert len(by_seconds) == 5
+    pd.testing.assert_frame_equal(by_seconds, by_timestamp)
+    pd.testing.assert_frame_equal(by_seconds, by_naive_string)
+
+
+def test_time_indexes_are_bounded(scan, tmp_path, monkeypatch):
+    monkeypatch.setattr(hdf5, "_time_indexes", {})
+    monkeypatch.setattr(hdf5, "TIME_INDEXES_SIZE", 2)
+    copies = [str(tmp_path / f"copy{n}.h5") for n in range(3)]
+    for copy in copies:
+        with open(scan, "rb") as source, open(copy, "wb") as target:
+            target.write(source.read())
+        hdf5.read_time_window(copy, "Scan000", START, START + 1)
+    assert [key[0] for key in hdf5._time_indexes] == [os.path.abspath(copy) for copy in copies[1:]]
+
+    # A new version of a file replaces the index of the previous one
+    hdf5.read_time_window(copies[1], "Scan000", START, START + 1)  # Used last : copies[2] is the oldest now
+    with h5py.File(copies[2], "a") as f:
+        f["RawData/Scan000/Detector000/NavAxes/Axis00"][0] = START - 1
+    os.utime(copies[2], ns=(0, 0))
+    assert len(hdf5.read_time_window(copies[2], "Scan000", START - 1, START + 1)[0]) == 3
+    assert len(hdf5._time_indexes) == 2
+    assert hdf5._time_indexes[(os.path.abspath(copies[2]), "Scan000", "Detector000", "NavAxes")][0] == 0
+
+
+@pytest.mark.parametrize("dtype", ["<f8", ">f8", "<i4", ">u2"])
+def test_memmap_dataset_contiguous(tmp_path, dtype):
+    path = str(tmp_path / "contiguous.h5")
+    values = (np.arange(200) * 3).astype(dtype).reshape(100, 2)
+    with h5py.File(path, "w") as f:
+        f.create_dataset("signal", data=values)
+    with h5py.File(path, "r") as f:
+        mapped = hdf5.memmap_dataset(f["signal"])
+        assert isinstance(mapped, np.memmap)
+        assert mapped.dtype == np.dtype(dtype)  # The file's byte order, read as it is stored
+        np.testing.assert_array_equal(mapped, values)
+        np.testing.assert_array_equal(hdf5.read_signal(f["signal"]), values[:, 0])
+    assert not mapped.flags.writeable
+
+
+@pytest.mark.parametrize("options", [{"chunks": (10, 1)}, {"compression": "gzip"}, {"shuffle": True},
+                                     {"maxshape": (None, 1)}])
+def test_memmap_dataset_falls_back_on_chunked_datasets(tmp_path, options):
+    path = str(tmp_path / "chunked.h5")
+    values = np.linspace(0, 1, 100).astype(">f4").reshape(100, 1)
+    with h5py.File(path, "w") as f:
+        f.create_dataset("signal", data=values, **options)
+        f.create_dataset("empty", shape=(100, 1), dtype="f8")  # Never written : no offset
+    with h5py.File(path, "r") as f:
+        assert hdf5.memmap_dataset(f["signal"]) is None
+        assert hdf5.memmap_dataset(f["empty"]) is None
+        np.testing.assert_array_equal(hdf5.read_signal(f["signal"]), values[:, 0])
+
+
+def test_map_scan_as_a_full_load(scan):
+    seconds, signals = hdf5.map_scan(scan, "Scan000", "Detector000", "NavAxes", "Data0D", list(CARDS))
+    np.testing.assert_array_equal(seconds, START + 0.5 * np.arange(NB_SAMPLES))
+    for card_signals, card in zip(signals, CARDS):
+        frame = expected_frame(scan, card)
+        assert list(card_signals) == list(frame.columns)
+        for channel, values in card_signals.items():
+            np.testing.assert_array_equal(values, frame[channel].to_numpy())
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_campaign(scan, tmp_path, workers):
+    folder = tmp_path / "campaign"
+    (folder / "day2").mkdir(parents=True)
+    with open(scan, "rb") as source:
+        content = source.read()
+    files = [str(folder / "day1.h5"), str(folder / "day2" / "run.hdf5")]
+    for path in files:
+        with open(path, "wb") as target:
+            target.write(content)
+    (folder / "notes.txt").write_text("Not an acquisition")
+    (folder / "broken.h5").write_text("Not an HDF5 file")
+
+    frames, timings, errors = hdf5.load_campaign(str(folder), cards=["CH00", "CH01", "CH02"], workers=workers)
+    broken = str(folder / "broken.h5")
+    assert sorted(frames) == [(path, "Scan000", card) for path in files for card in CARDS]
+    for (path, _, card), df in frames.items():
+        pd.testing.assert_frame_equal(df, expected_frame(path, card))
+    assert set(timings) == {broken} | set(files)
+    assert set(errors) == {(broken, None, None)} | {(path, "Scan000", "CH02") for path in files}
+    assert errors[(files[0], "Scan000", "CH02")].startswith("KeyError")
+
+    frame, _, _ = hdf5.load_campaign(files, concat=True, workers=workers)
+    assert frame.index.names == ["file", "scan", "card", "time"]
+    assert len(frame) == len(files) * len(CARDS) * NB_SAMPLES
+    card = frame.loc[(files[1], "Scan000", "CH01")].dropna(axis=1, how="all")  # Columns of the other cards are NaN
+    pd.testing.assert_frame_equal(card, expected_frame(files[1], "CH01").rename_axis("time"))
+
+
+def test_load_campaign_without_files(tmp_path):
+    frame, timings, errors = hdf5.load_campaign(str(tmp_path), concat=True)
+    assert frame.empty and timings == {} and errors == {}
@@ -0,0 +1,225 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test the tolm file generation of keithleyDataClass
+"""
+
+# Imports
+import os
+import stat
+
+import numpy as np
+import pytest
+import toml
+
+from keithleyDataClass import (Keithley2700, KeithleyProject, ModuleKeithley, GenerationCancelled, parse_channel_spec,
+                               DEFAULT_SENSORS_SETTINGS)
+
+
+# Functions definitions
+
+
+def old_emitter(instrument: Keithley2700):
+
+    """The tolm file as the first version of Keithley2700.write_tolm wrote it (string, toml.loads, toml.dump)"""
+
+    tolm = f"""
+title = "this is the configuration file of the Keithley plugin"
+
+[Keithley.27XX]
+title = "Configuration entry for a Keithley 27XX Multimeter/Switch System"
+
+[Keithley.27XX.{instrument.name}]
+title = \"{instrument.title}\"
+rsrc_name_example = \"{instrument.rsrc_name_example}\"
+rsrc_name = \"{instrument.rsrc_name}\"
+model_name = \"{instrument.model_name}\"
+panel = \"{instrument.panel}\"
+termination_character = \"{instrument.termination_character}\"
+"""
+    for module in instrument.modules:
+        tolm += f"""
+[Keithley.27XX.{instrument.name}.{module.name}]
+module_name = \"{module.number}\"
+info = \"{module.info}\"
+
+[Keithley.27XX.{instrument.name}.{module.name}.CHANNELS]
+"""
+    for module in instrument.modules:
+        for chan in module.channels:
+            tolm += f"\n[Keithley.27XX.{instrument.name}.{module.name}.CHANNELS.{chan.number}]\n"
+            tolm += f"mode = \"{chan.mode}\"\n"
+            if chan.transducer in ("tc", "frtd"):
+                tolm += f"transducer = \"{chan.transducer}\"\ntype = \"{chan.type}\"\n"
+            if chan.transducer == "tc":
+                tolm += f"ref_junc = \"{chan.ref_junc}\"\n"
+            if chan.transducer in ("tc", "frtd"):
+                tolm += f"resolution = \"{chan.resolution}\"\nnplc = \"{chan.nplc}\"\n"
+    return toml.dumps(toml.loads(tolm))
+
+
+# Tests
+
+
+@pytest.mark.parametrize("modules", [
+    {},
+    {"MODULE01": ("7706", {"frtd": ["101"], "tc": [str(c) for c in range(102, 120)], "Volt": ["120", "121"]})},
+    {"MODULE01": ("7706", {"tc": ["101"]}), "MODULE02": ("7702", {}), "MODULE03": ("7702", {"Volt": ["301"]})},
+    {"MODULE01": ("7702", {}), "MODULE02": ("7702", {})},
+])
+def test_byte_identical_to_old_emitter(make_keithley, modules, tmp_path):
+    instrument = make_keithley(modules)
+    expected = old_emitter(instrument)
+    assert instrument.to_toml_string() == expected
+    assert toml.dumps(instrument.to_dict()) == expected
+
+    path = tmp_path / "config.toml"
+    instrument.update_tolm(path)
+    assert path.read_text() == expected
+
+
+@pytest.mark.parametrize("channels, expected", [
+    ("213-216", ["213", "214", "215", "216"]),
+    ("201, 203,210-211", ["201", "203", "210", "211"]),
+    (["205", 206], ["205", "206"]),
+    (0b101, ["201", "203"]),
+    (np.int64(0b11), ["201", "202"]),
+    ([True, False, True], ["201", "203"]),
+    (np.array([True, False, True]), ["201", "203"]),
+    (np.array([210, 215]), ["210", "215"]),
+    ("", []),
+])
+def test_parse_channel_spec(channels, expected):
+    assert parse_channel_spec(channels, slot=2) == expected
+
+
+@pytest.mark.parametrize("channels, slot", [
+    (1 << 40, 2),  # A card has 40 channels
+    (-1, 2),
+    (0b1, None),  # Masks need the slot
+    ("201-abc", 2),
+])
+def test_parse_channel_spec_errors(channels, slot):
+    with pytest.raises(ValueError):
+        parse_channel_spec(channels, slot)
+
+
+@pytest.mark.parametrize("channels", ["201,201", "201-205,203", ["202", "202"]])
+def test_config_channels_duplicates_configure_nothing(bench, channels):
+    module = bench.MODULE03
+    with pytest.raises(ValueError):
+        module.config_channels(channels, "tc")
+    assert module.channel_count() == 0
+    assert module.used_mask() == 0
+
+
+def test_config_channels_conflict_configures_nothing(bench):
+    module = bench.MODULE02
+    before = module.sensor_channels()
+    with pytest.raises(ValueError):
+        module.config_channels("210-213", "Volt")  # 213 is a thermocouple
+    assert module.sensor_channels() == before
+
+
+def test_config_channel_bad_number_keeps_indexes_in_sync(bench):
+    module = bench.MODULE03
+    with pytest.raises(ValueError):
+        module.config_channel("abc", "tc")
+    assert module.get_channel("abc") is None
+    assert module.channel_count() == 0
+    module.config_channels("301-302", "tc")
+    assert module.sensor_mask("tc") == (1 << 301) | (1 << 302)
+
+
+def test_from_toml_round_trip(bench, tmp_path):
+    path = tmp_path / "config.toml"
+    bench.update_tolm(path)
+    loaded = Keithley2700.from_toml(path)
+    assert loaded.to_toml_string() == bench.to_toml_string()
+    assert loaded.MODULE02.sensor_channels() == bench.MODULE02.sensor_channels()
+    assert loaded.MODULE02.c213.transducer == "tc"
+    assert loaded.sensors_settings["Tc"]["type"] == DEFAULT_SENSORS_SETTINGS["Tc"]["type"]
+
+
+def test_project_from_toml_shares_profiles(make_keithley, tmp_path):
+    project = KeithleyProject()
+    for name in ("I1", "I2"):
+        instrument = project.add_instrument(name, "title", ["ASRL1::INSTR"], "ASRL7::INSTR", "2701", "rear", "LF")
+        instrument.add_module("MODULE01", "7702", "")
+        instrument.MODULE01.config_channels("101-104", "tc")
+    path = tmp_path / "project.toml"
+    project.write_tolm(path)
+
+    loaded = KeithleyProject.from_toml(path)
+    assert loaded.to_toml_string() == project.to_toml_string()
+    assert loaded.I1.MODULE01.profiles is loaded.I1.profiles
+    assert loaded.I1.profiles["tc"] is loaded.I2.profiles["tc"]
+
+
+def test_update_tolm_only_writes_changes(bench, tmp_path):
+    path = tmp_path / "config.toml"
+    assert bench.update_tolm(path)
+    assert not bench.update_tolm(path)
+
+    # Edited by someone else : written again, with the permissions of the deployed file
+    os.chmod(path, 0o664)
+    path.write_text(path.read_text() + "# edited\n")
+    assert bench.update_tolm(path)
+    assert path.read_text() == bench.to_toml_string()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o664
+
+    # Changed then changed back : rendered, but the file is left as it is
+    bench.MODULE03.mark_dirty()
+    assert not bench.update_tolm(path)
+    assert os.listdir(tmp_path) == ["config.toml"]
+
+
+def test_update_tolm_cancelled_leaves_the_file(bench, tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text("deployed")
+    progress = []
+    with pytest.raises(GenerationCancelled):
+        bench.update_tolm(path, progress=lambda done, total: progress.append(done), cancelled=lambda: len(progress) == 3)
+    assert path.read_text() == "deployed"
+    assert os.listdir(tmp_path) == ["config.toml"]
+
+    bench.update_tolm(path, progress=lambda done, total: progress.append((done, total)))
+    assert progress[-1] == (bench.section_count(), bench.section_count())
+
+
+def test_update_tolm_only_renders_the_changed_modules(bench, tmp_path, monkeypatch):
+    path = tmp_path / "config.toml"
+    rendered = []
+    iter_channel_sections = ModuleKeithley.iter_channel_sections
+
+    def counted(module, instrument_name):
+        rendered.append(module.name)
+        yield from iter_channel_sections(module, instrument_name)
+
+    monkeypatch.setattr(ModuleKeithley, "iter_channel_sections", counted)
+    bench.update_tolm(path)
+    assert rendered == ["MODULE03", "MODULE01", "MODULE02"]
+
+    # The channels of the other modules are copied from the deployed file
+    rendered.clear()
+    progress = []
+    bench.MODULE02.config_channel("215", "tc")
+    bench.MODULE01.info = "Moved to the left of the bench"
+    assert bench.update_tolm(path, progress=lambda done, total: progress.append((done, total)))
+    assert rendered == ["MODULE02"]
+    assert path.read_text() == bench.to_toml_string()
+    assert progress[-1] == (bench.section_count(), bench.section_count())
+
+    # Renamed : rendered again under its new name
+    rendered.clear()
+    bench.MODULE03.name = "MODULE04"
+    assert bench.update_tolm(path)
+    assert rendered == ["MODULE04"]
+    assert path.read_text() == bench.to_toml_string()
+
+    # Edited by someone else : nothing is copied from it
+    rendered.clear()
+    path.write_text(path.read_text().replace("213", "0213"))  # Another size : another file stat
+    assert bench.update_tolm(path)
+    assert rendered == ["MODULE04", "MODULE01", "MODULE02"]
+    assert path.read_text() == bench.to_toml_string()
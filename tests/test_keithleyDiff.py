@@ -0,0 +1,104 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test that a patched tolm file is the file a full regeneration writes
+"""
+
+# Imports
+import os
+import random
+import stat
+
+import pytest
+
+from keithleyDataClass import iter_tolm_sections
+from keithleyDiff import apply_patch, diff_instruments, update_deployed
+
+# Constants
+BEFORE = {"MODULE01": ("7706", {"frtd": ["101"], "tc": ["102", "103"]}),
+          "MODULE02": ("7702", {"tc": ["201", "202"], "Volt": ["240"]}),
+          "MODULE03": ("7702", {"Volt": ["301"]})}
+
+
+# Functions definitions
+
+
+def random_modules(rng: random.Random):
+
+    """Get random modules for build_keithley : some cards, some of their channels, some sensors"""
+
+    modules = {}
+    for slot in rng.sample(range(1, 6), rng.randint(0, 5)):
+        channels = rng.sample(range(1, 11), rng.randint(0, 6))
+        sensors = {"frtd": [], "tc": [], "Volt": []}
+        for channel in channels:
+            sensors[rng.choice(list(sensors))].append(f"{slot}{channel:02d}")
+        modules[f"MODULE{slot:02d}"] = (rng.choice(["7702", "7706"]), sensors)
+    return modules
+
+
+# Tests
+
+
+@pytest.mark.parametrize("after", [
+    BEFORE,  # Nothing changed
+    dict(BEFORE, MODULE02=("7702", {})),  # A module loses all its channels : empty CHANNELS table
+    dict(BEFORE, MODULE01=("7706", {})),
+    {"MODULE01": ("7706", {}), "MODULE02": ("7702", {}), "MODULE03": ("7702", {})},
+    dict(BEFORE, MODULE02=("7702", {"frtd": ["201"], "tc": ["202", "210"], "Volt": ["240"]})),  # Rewired
+    dict(BEFORE, MODULE04=("7706", {"tc": ["401"]})),
+    {"MODULE03": BEFORE["MODULE03"], "MODULE01": BEFORE["MODULE01"]},  # Reordered, one removed
+])
+def test_patch_equals_regeneration(make_keithley, tmp_path, after):
+    path = tmp_path / "config.toml"
+    path.write_text(make_keithley(BEFORE).to_toml_string())
+    new = make_keithley(after)
+    update_deployed(str(path), new)
+    assert path.read_text() == new.to_toml_string()
+    assert not new.update_tolm(path)  # Up to date : same hash as a full regeneration
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_patch_equals_regeneration(make_keithley, tmp_path, seed):
+    rng = random.Random(seed)
+    path = tmp_path / "config.toml"
+    path.write_text(make_keithley(random_modules(rng)).to_toml_string())
+    new = make_keithley(random_modules(rng))
+    update_deployed(str(path), new)
+    assert path.read_text() == new.to_toml_string()
+
+
+@pytest.mark.parametrize("patched", [0, 1])
+def test_patch_one_instrument_of_a_project_file(make_keithley, tmp_path, patched):
+    rng = random.Random(patched)
+    instruments = [make_keithley(random_modules(rng), name) for name in ("I1", "I2")]
+    path = tmp_path / "project.toml"
+    path.write_text("".join(iter_tolm_sections(instruments)))
+    instruments[patched] = make_keithley(random_modules(rng), instruments[patched].name)
+    update_deployed(str(path), instruments[patched])
+    assert path.read_text() == "".join(iter_tolm_sections(instruments))
+
+
+def test_apply_patch_keeps_the_file_mode(make_keithley, tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text(make_keithley(BEFORE).to_toml_string())
+    os.chmod(path, 0o644)
+    changes = diff_instruments(make_keithley(BEFORE), make_keithley(dict(BEFORE, MODULE03=("7702", {}))))
+    assert apply_patch(str(path), changes) == len(changes) > 0
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert os.listdir(tmp_path) == ["config.toml"]
+
+
+def test_apply_patch_removes_its_temporary_file_on_error(make_keithley, tmp_path, monkeypatch):
+    path = tmp_path / "config.toml"
+    deployed = make_keithley(BEFORE).to_toml_string()
+    path.write_text(deployed)
+    changes = diff_instruments(make_keithley(BEFORE), make_keithley({}))
+
+    def failing_replace(source, destination):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        apply_patch(str(path), changes)
+    assert os.listdir(tmp_path) == ["config.toml"]
+    assert path.read_text() == deployed
@@ -0,0 +1,86 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test the compact session files of the GUI
+"""
+
+# Imports
+import json
+
+import pytest
+
+from cardModel import CardModel
+from sessionStore import (SESSION_VERSION, card_from_session, card_to_session, read_session, session_contents,
+                          session_snapshot, write_session)
+
+# Constants
+CHANNELS = [str(e) for e in range(201, 241)]
+
+
+# Functions definitions
+
+
+def make_card():
+    card = CardModel("MODULE02", "7702", "Bench 2", CHANNELS)
+    card.assign_many({"201": "Frtd", "202": "Tc", "203": "Tc", "240": "Volt"})
+    return card
+
+
+# Tests
+
+
+def test_card_entry_is_compact():
+    entry = card_to_session(make_card())
+    assert entry == {"name": "MODULE02", "number": "7702", "info": "Bench 2", "channels": [201, 40],
+                     "Frtd": "1", "Tc": "6", "Volt": format(1 << 39, "x")}
+
+
+@pytest.mark.parametrize("channels", [CHANNELS, ["101", "103", "104"], ["A1", "A2"], []])
+def test_card_round_trip(channels):
+    card = CardModel("MODULE01", "7706", "", channels)
+    card.assign_many(dict(zip(channels, ["Frtd", "Tc", "Volt"])))
+    restored = card_from_session(json.loads(json.dumps(card_to_session(card))))
+    assert restored.channels == card.channels
+    assert restored.assignment == card.assignment
+    assert restored.to_settings() == card.to_settings()
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / "session" / "session.json")
+    session = session_snapshot([make_card()], {"rsrc_name": "ASRL7::INSTR"}, None, {"7702": make_card().template()})
+    assert write_session(path, session, sequence=2)
+    assert not write_session(path, session_snapshot([]), sequence=1)  # Older snapshot : dropped
+    assert read_session(path) == session
+
+    cards, keithley_settings, sensors_settings, templates = session_contents(read_session(path))
+    assert [card.to_settings() for card in cards] == [make_card().to_settings()]
+    assert keithley_settings == {"rsrc_name": "ASRL7::INSTR"}
+    assert sensors_settings is None
+    assert templates == {"7702": make_card().template()}
+
+
+@pytest.mark.parametrize("content", ["", "not json", "[]", json.dumps({"version": SESSION_VERSION + 1, "cards": []})])
+def test_read_unusable_session(tmp_path, content):
+    path = tmp_path / "session.json"
+    path.write_text(content)
+    assert read_session(str(path)) is None
+    assert read_session(str(tmp_path / "missing.json")) is None
+
+
+@pytest.mark.parametrize("change", [
+    lambda session: session.pop("cards"),
+    lambda session: session.update(cards={"MODULE02": {}}),
+    lambda session: session["cards"][0].pop("number"),
+    lambda session: session["cards"][0].update(name=2),
+    lambda session: session["cards"][0].update(channels=201),
+    lambda session: session["cards"][0].update(Tc=format(1 << 40, "x")),  # Wider than the channels
+    lambda session: session["cards"][0].update(Tc="-1"),
+    lambda session: session["cards"][0].update(Tc="zz"),
+    lambda session: session.update(sensors_settings=[]),
+    lambda session: session.update(templates={"7702": {"Tc": ["1"]}}),
+])
+def test_malformed_session(change):
+    session = json.loads(json.dumps(session_snapshot([make_card()])))
+    change(session)
+    with pytest.raises((KeyError, IndexError, ValueError, TypeError)):
+        session_contents(session)
@@ -0,0 +1,165 @@
+"""
+Creator : Yann Berton
+Date : 18/10/2026
+Objective : Test the GUI's main window, on Qt's offscreen platform
+"""
+
+# Imports
+import os
+import subprocess
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+import tomlGeneratorGUI  # noqa: E402
+
+
+# Functions definitions
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+
+
+@pytest.fixture
+def window(app):
+    window = tomlGeneratorGUI.MainWindow(keithleyChannelList=[str(e) for e in range(101, 141)])
+    yield window
+    window.close()
+
+
+def generate(app, window, monkeypatch, path):
+
+    """Generate the tolm file of a window and wait for the worker"""
+
+    monkeypatch.setattr(tomlGeneratorGUI, "getAFilesPathToSave", lambda *args, **kwargs: str(path))
+    window.generate_toml()
+    while window.worker is not None:
+        app.processEvents()
+    return path.read_text()
+
+
+# Tests
+
+
+def test_generate_toml_uses_the_cards_as_they_are(app, window, monkeypatch, tmp_path):
+    card = window.cards[0]
+    card.assign("101", "Frtd")
+    assert "CHANNELS.101]" in generate(app, window, monkeypatch, tmp_path / "never_saved.toml")
+
+    window.save_the_list()
+    card.assign("102", "Tc")  # Edited after "Save the lists"
+    content = generate(app, window, monkeypatch, tmp_path / "edited.toml")
+    assert "CHANNELS.101]" in content and "CHANNELS.102]" in content
+
+
+def test_malformed_session_starts_a_new_one(app, tmp_path):
+    path = tmp_path / "session.json"
+    path.write_text('{"version": 1, "cards": [{"name": "MODULE01", "info": "", "channels": [101, 40]}]}')
+    window = tomlGeneratorGUI.MainWindow(keithleyChannelList=[str(e) for e in range(101, 141)], session_path=str(path))
+    try:
+        assert [card.name for card in window.cards] == ["MODULE01"]
+        assert window.cards[0].number == "7706"  # A new card, not the session's one
+        assert "could not be restored" in window.statusBar().currentMessage()
+    finally:
+        window.session_timer.stop()
+        window.close()
+
+
+@pytest.mark.parametrize("content", ["not = [toml", "title = 'no instrument'\n", "[Keithley]\nmodel = 1\n", None])
+def test_open_toml_reports_unreadable_files(app, window, monkeypatch, tmp_path, content):
+    path = tmp_path / "config.toml"
+    if content is not None:
+        path.write_text(content)
+    monkeypatch.setattr(tomlGeneratorGUI, "getAFilesPath", lambda *args, **kwargs: str(path))
+    window.open_toml()
+    assert "could not be opened" in window.statusBar().currentMessage()
+    assert len(window.cards) == 1  # The tabs are kept
+
+
+def test_open_toml(app, window, monkeypatch, tmp_path, bench):
+    path = tmp_path / "config.toml"
+    bench.update_tolm(path)
+    monkeypatch.setattr(tomlGeneratorGUI, "getAFilesPath", lambda *args, **kwargs: str(path))
+    window.open_toml()
+    assert [card.name for card in window.cards] == ["MODULE01", "MODULE02", "MODULE03"]
+    assert window.cards[1].checked("Tc") == ["213", "214"]
+    assert generate(app, window, monkeypatch, tmp_path / "generated.toml") == path.read_text()
+
+
+def test_open_toml_keeps_the_channels_out_of_the_slot(app, window, monkeypatch, tmp_path):
+    # The sample file of keithleyDataClass : Volt 110 and 109 on the slot 2 card
+    subprocess.run([sys.executable, os.path.join(os.path.dirname(tomlGeneratorGUI.__file__), "keithleyDataClass.py")],
+                   cwd=tmp_path, check=True)
+    path = tmp_path / "config_keitley_test.tolm"
+    monkeypatch.setattr(tomlGeneratorGUI, "getAFilesPath", lambda *args, **kwargs: str(path))
+    window.open_toml()
+    card = window.cards[0]
+    assert card.channels[-2:] == ["110", "109"]
+    assert card.checked("Volt") == ["110", "109"]
+    assert card.checked("Tc")[:2] == ["213", "214"]
+    assert generate(app, window, monkeypatch, tmp_path / "generated.toml") == path.read_text()
+
+
+def test_new_tabs_start_from_the_template_of_their_number(app, window):
+    window.add_new_tab()  # MODULE02, a 7702 card of slot 2
+    window.tabs.setCurrentIndex(1)
+    window.cards[1].assign_many({"201": "Frtd", "202": "Tc"})
+    window.save_template()
+    window.add_new_tab()  # Slot 3 : no default number, the shown card's one
+    assert window.cards[2].number == "7702"
+    assert (window.cards[2].checked("Frtd"), window.cards[2].checked("Tc")) == (["301"], ["302"])
+
+
+def test_templates_need_a_card_number(app, window):
+    window.add_new_tab()
+    window.cards[1].set_field("number", "")
+    window.tabs.setCurrentIndex(1)
+    window.cards[1].assign("201", "Tc")
+    window.save_template()
+    assert window.templates == {}
+    assert "number" in window.statusBar().currentMessage()
+    window.add_new_tab()  # A blank card stays blank
+    assert window.cards[2].number == "" and window.cards[2].checked("Tc") == []
+    window.apply_template()
+    assert window.cards[2].checked("Tc") == []
+
+
+def test_card_edits_undo_and_redo(app, window):
+    card = window.cards[0]
+    card.assign_many({"101": "Frtd", "102": "Tc"})
+    card.assign("101", "Volt")
+    assert window.undo_stack.count() == 2
+    window.undo_stack.undo()
+    assert (card.checked("Frtd"), card.checked("Volt")) == (["101"], [])
+    window.undo_stack.undo()
+    assert card.assignment == {}
+    window.undo_stack.redo()
+    window.undo_stack.redo()
+    assert card.assignment == {"101": "Volt", "102": "Tc"}
+    assert window.undo_stack.count() == 2  # Replaying records nothing
+
+
+def test_card_edits_merge_the_typing_in_a_field(app, window):
+    card = window.cards[0]
+    for text in ("B", "Be", "Ben"):
+        card.set_field("info", text)
+    card.set_field("number", "7702")  # Another field : another edit
+    assert window.undo_stack.count() == 2
+    window.undo_stack.undo()
+    window.undo_stack.undo()
+    assert (card.info, card.number) == ("", "7706")
+    window.undo_stack.redo()
+    assert card.info == "Ben"
+
+
+def test_card_edits_of_a_closed_tab_are_dropped(app, window):
+    window.add_new_tab()
+    card = window.cards[1]
+    card.assign("201", "Tc")
+    window.close_tab(1)
+    window.undo_stack.undo()
+    assert card.checked("Tc") == ["201"]  # Not replayed on a card which is gone